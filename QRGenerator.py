@@ -1,9 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import qrcode
-from PIL import Image, ImageTk
-import json
-import os
+from PIL import ImageTk
+
+from lifetag import export
+from lifetag.engine import FORM_FIELDS, StandardRenderer, validate_record
+from lifetag.preview import LivePreview
+from lifetag.raster import rasterize_matrix
+from lifetag.settings import DEFAULT_PROFILE, get_settings
 
 class MedicalEmergencyQRGenerator:
     def __init__(self, root):
@@ -21,6 +24,7 @@ class MedicalEmergencyQRGenerator:
         
         # Variables for storing information
         self.qr_image = None
+        self.qr_matrix = None
         self.photo_image = None
         
         # Info message and emergency number (can be configured)
@@ -124,6 +128,16 @@ class MedicalEmergencyQRGenerator:
         )
         self.clear_button.pack(side=tk.LEFT, padx=5)
         
+        # Live preview toggle
+        self.live_preview_var = tk.BooleanVar(value=False)
+        self.live_preview_check = ttk.Checkbutton(
+            self.buttons_frame,
+            text="Live Preview",
+            variable=self.live_preview_var,
+            command=self.toggle_live_preview
+        )
+        self.live_preview_check.pack(side=tk.LEFT, padx=5)
+        
         # QR Code display frame
         self.qr_frame = ttk.LabelFrame(self.main_frame, text="QR Code")
         self.qr_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -176,6 +190,8 @@ class MedicalEmergencyQRGenerator:
         
         # Try to load saved info message and emergency number
         self.load_info_settings()
+        
+        self.setup_live_preview()
     
     def show_info_popup(self):
         """Show information popup with customized message and emergency number"""
@@ -249,7 +265,7 @@ class MedicalEmergencyQRGenerator:
         """Open settings dialog to configure info message and emergency number"""
         settings = tk.Toplevel(self.root)
         settings.title("Info Settings")
-        settings.geometry("500x300")
+        settings.geometry("500x340")
         settings.configure(bg=self.secondary_color)
         settings.resizable(False, False)
         
@@ -261,6 +277,28 @@ class MedicalEmergencyQRGenerator:
         frame = ttk.Frame(settings, padding=20)
         frame.pack(fill=tk.BOTH, expand=True)
         
+        # Profile selector; typing a new name creates a profile on save
+        profile_frame = ttk.Frame(frame)
+        profile_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        profile_label = tk.Label(
+            profile_frame,
+            text="Profile:",
+            font=("Arial", 12),
+            width=20
+        )
+        profile_label.pack(side=tk.LEFT)
+        
+        profile_var = tk.StringVar(value=self.settings.active)
+        profile_box = ttk.Combobox(
+            profile_frame,
+            textvariable=profile_var,
+            values=list(self.settings.profiles),
+            width=18,
+            font=("Arial", 11)
+        )
+        profile_box.pack(side=tk.LEFT, padx=5)
+        
         # Info message label and text field
         message_label = tk.Label(
             frame,
@@ -301,6 +339,14 @@ class MedicalEmergencyQRGenerator:
         )
         number_entry.pack(side=tk.LEFT, padx=5)
         
+        def show_profile(event=None):
+            values = self.settings.profile(profile_var.get())
+            message_text.delete("1.0", tk.END)
+            message_text.insert("1.0", values["info_message"])
+            number_var.set(values["emergency_number"])
+        
+        profile_box.bind("<<ComboboxSelected>>", show_profile)
+        
         # Buttons frame
         buttons_frame = ttk.Frame(frame)
         buttons_frame.pack(fill=tk.X, pady=10)
@@ -309,7 +355,8 @@ class MedicalEmergencyQRGenerator:
         save_button = tk.Button(
             buttons_frame,
             text="Save",
-            command=lambda: self.save_info_settings(message_text.get("1.0", tk.END).strip(), number_var.get()),
+            command=lambda: self.save_info_settings(message_text.get("1.0", tk.END).strip(), number_var.get(),
+                                                    profile_var.get().strip() or DEFAULT_PROFILE),
             bg=self.primary_color,
             fg="white",
             font=("Arial", 12),
@@ -337,42 +384,44 @@ class MedicalEmergencyQRGenerator:
         y = (self.root.winfo_rooty() + (self.root.winfo_height() // 2)) - (height // 2)
         settings.geometry(f"{width}x{height}+{x}+{y}")
     
-    def save_info_settings(self, message, number):
-        """Save the info message and emergency number"""
+    def save_info_settings(self, message, number, profile=DEFAULT_PROFILE):
+        """Save the info message and emergency number to a profile and make it active"""
         self.info_message = message
+        if number != self.emergency_number:
+            # The emergency number is part of the QR payload
+            self.mark_stale()
         self.emergency_number = number
+        self.settings.update(profile, info_message=message, emergency_number=number)
+        self.settings.set_active(profile)
         
-        # Save settings to a file
-        try:
-            settings_data = {
-                "info_message": self.info_message,
-                "emergency_number": self.emergency_number
-            }
-            
-            with open("qr_info_settings.json", "w") as file:
-                json.dump(settings_data, file)
-                
+        # Close the settings window
+        for widget in self.root.winfo_children():
+            if isinstance(widget, tk.Toplevel) and widget.title() == "Info Settings":
+                widget.destroy()
+                break
+        
+        # The file is written on a background thread; report back once it's done
+        self.watch_settings_save(self.settings.save_async())
+    
+    def watch_settings_save(self, future):
+        """Poll a background settings write from the Tk thread and report how it went"""
+        if not future.done():
+            self.root.after(50, self.watch_settings_save, future)
+            return
+        error = future.exception()
+        if error:
+            messagebox.showerror("Error", f"Failed to save settings: {str(error)}")
+        else:
             messagebox.showinfo("Settings Saved", "Your information settings have been saved.")
-            
-            # Close the settings window
-            for widget in self.root.winfo_children():
-                if isinstance(widget, tk.Toplevel) and widget.title() == "Info Settings":
-                    widget.destroy()
-                    break
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
     
     def load_info_settings(self):
-        """Load saved info message and emergency number"""
-        try:
-            if os.path.exists("qr_info_settings.json"):
-                with open("qr_info_settings.json", "r") as file:
-                    settings_data = json.load(file)
-                    self.info_message = settings_data.get("info_message", self.info_message)
-                    self.emergency_number = settings_data.get("emergency_number", self.emergency_number)
-        except Exception:
-            # Silently handle errors, keep defaults
-            pass
+        """Load the info message and emergency number of the active profile"""
+        self.settings = get_settings()
+        values = self.settings.profile()
+        self.info_message = values["info_message"]
+        self.emergency_number = values["emergency_number"]
+        if self.settings.load_error:
+            messagebox.showwarning("Settings", self.settings.load_error)
     
     def create_form_field(self, label_text, variable_name, height=1):
         """Create a form field with label and entry widget"""
@@ -417,12 +466,10 @@ class MedicalEmergencyQRGenerator:
     
     def validate_form_data(self, data):
         """Validate that essential fields are filled"""
-        required_fields = ["full_name", "blood_group", "emergency_contact_name", "emergency_contact_phone"]
-        
-        for field in required_fields:
-            if not data.get(field):
-                messagebox.showerror("Validation Error", f"Please fill in the {field.replace('_', ' ')} field.")
-                return False
+        errors = validate_record(data)
+        if errors:
+            messagebox.showerror("Validation Error", errors[0])
+            return False
         
         return True
     
@@ -433,44 +480,11 @@ class MedicalEmergencyQRGenerator:
         if not self.validate_form_data(data):
             return
         
-        # Create QR code data
-        qr_data = {
-            "type": "MEDICAL_EMERGENCY",
-            "personal_info": {
-                "name": data.get("full_name", ""),
-                "dob": data.get("dob", ""),
-                "blood_group": data.get("blood_group", "")
-            },
-            "medical_info": {
-                "allergies": data.get("allergies", ""),
-                "conditions": data.get("medical_conditions", ""),
-                "medications": data.get("medications", "")
-            },
-            "emergency_contact": {
-                "name": data.get("emergency_contact_name", ""),
-                "phone": data.get("emergency_contact_phone", ""),
-                "relationship": data.get("emergency_contact_relation", "")
-            },
-            "address": data.get("address", ""),
-            "additional_info": data.get("additional_info", ""),
-            "emergency_number": self.emergency_number
-        }
-        
-        # Convert to JSON string
-        qr_json = json.dumps(qr_data)
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_json)
-        qr.make(fit=True)
-        
-        # Create QR code image
-        self.qr_image = qr.make_image(fill_color="black", back_color="white")
+        # Render the QR code through the shared engine
+        renderer = StandardRenderer(emergency_number=self.emergency_number)
+        result = renderer.render(data)
+        self.qr_image = result.image
+        self.qr_matrix = result.qr
         
         # Display QR code
         self.display_qr_code()
@@ -481,17 +495,55 @@ class MedicalEmergencyQRGenerator:
     def display_qr_code(self):
         """Display the generated QR code"""
         if self.qr_image:
-            # Remove initial message if it exists
-            for widget in self.qr_image_label.winfo_children():
-                widget.destroy()
-            
-            # Resize image for display
-            img = self.qr_image.resize((250, 250), Image.LANCZOS)
-            self.photo_image = ImageTk.PhotoImage(img)
-            
-            # Display image
-            self.qr_image_label.config(image=self.photo_image)
-            self.qr_image_label.image = self.photo_image  # Keep a reference
+            # Draw the modules directly at display size
+            self.show_image(rasterize_matrix(self.qr_matrix, 250, "black", "white", "RGB"))
+    
+    def setup_live_preview(self):
+        """Re-render a preview in the background as the form is edited"""
+        self.live_preview = LivePreview(self.root, self.get_preview_data, self.render_preview, self.show_preview,
+                                        on_edit=self.mark_stale)
+        variables = [getattr(self, field + "_var") for field in FORM_FIELDS if hasattr(self, field + "_var")]
+        text_widgets = [getattr(self, field) for field in FORM_FIELDS if isinstance(getattr(self, field, None), tk.Text)]
+        self.live_preview.watch(variables, text_widgets)
+    
+    def toggle_live_preview(self):
+        """Turn the live preview on or off"""
+        self.live_preview.set_enabled(self.live_preview_var.get())
+    
+    def get_preview_data(self):
+        """Form data for the live preview, or None while required fields are empty"""
+        data = self.get_form_data()
+        return None if validate_record(data) else data
+    
+    def render_preview(self, data):
+        """Render the QR code and a display-size copy (runs on the preview worker thread)"""
+        result = StandardRenderer(emergency_number=self.emergency_number).render(data)
+        return result, rasterize_matrix(result.qr, 250, "black", "white", "RGB")
+    
+    def show_preview(self, preview, data):
+        """Show a finished preview and make it the code that gets saved"""
+        result, image = preview
+        self.qr_image = result.image
+        self.qr_matrix = result.qr
+        self.show_image(image)
+        self.save_button.config(state=tk.NORMAL)
+    
+    def mark_stale(self):
+        """Stop saving the last generated code once the form no longer matches it"""
+        self.qr_image = None
+        self.save_button.config(state=tk.DISABLED)
+    
+    def show_image(self, img):
+        """Show a display-size image in the QR area"""
+        # Remove initial message if it exists
+        for widget in self.qr_image_label.winfo_children():
+            widget.destroy()
+        
+        self.photo_image = ImageTk.PhotoImage(img)
+        
+        # Display image
+        self.qr_image_label.config(image=self.photo_image)
+        self.qr_image_label.image = self.photo_image  # Keep a reference
     
     def save_qr_code(self):
         """Save the QR code to a file"""
@@ -501,14 +553,15 @@ class MedicalEmergencyQRGenerator:
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG files", "*.png"), ("All files", "*.*")],
+            filetypes=[("PNG files", "*.png"), ("WebP files", "*.webp"), ("All files", "*.*")],
             title="Save QR Code"
         )
         
         if file_path:
             try:
-                self.qr_image.save(file_path)
-                messagebox.showinfo("Success", f"QR code saved to {file_path}")
+                # Two-color codes are written as 1-bit palette PNGs
+                saved = export.save(self.qr_image, file_path)
+                messagebox.showinfo("Success", f"QR code saved to {file_path} ({len(saved) / 1024:.1f} KB)")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save QR code: {str(e)}")
     
@@ -550,6 +603,7 @@ class MedicalEmergencyQRGenerator:
         
         # Reset QR image
         self.qr_image = None
+        self.qr_matrix = None
         self.photo_image = None
 
 def main():
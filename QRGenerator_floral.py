@@ -1,13 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import qrcode
-from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageFilter, ImageOps, ImageColor
-import json
+from PIL import Image, ImageTk, ImageFilter, ImageOps, ImageColor
 import os
-import math
-import random
 from io import BytesIO
 
+from lifetag import export
+from lifetag.cache import MemoryRenderCache, renderer_cache_key
+from lifetag.engine import FORM_FIELDS, FloralRenderer, validate_record
+from lifetag.layers import LayeredWallpaper
+from lifetag.preview import LivePreview
+from lifetag.targets import DEVICE_PRESETS, MultiTargetRenderer
+
 
 class MedicalEmergencyQRGenerator:
     def __init__(self, root):
@@ -26,7 +29,14 @@ class MedicalEmergencyQRGenerator:
         
         # Variables for storing information
         self.qr_image = None
+        self.preview_image = None
+        self.generated_data = None
         self.photo_image = None
+        self.display_width = 400
+        self.renderer = FloralRenderer()
+        # Kept in memory only, so rendered medical data never lands on disk unasked
+        self.render_cache = MemoryRenderCache()
+        self.wallpaper = LayeredWallpaper(self.renderer)
         
         # Create main frame
         self.main_frame = ttk.Frame(self.root, padding=20)
@@ -101,6 +111,21 @@ class MedicalEmergencyQRGenerator:
         )
         self.save_button.pack(side=tk.LEFT, padx=5)
         
+        # Save for every device size button
+        self.save_all_button = tk.Button(
+            self.buttons_frame,
+            text="Save for All Devices",
+            command=self.save_all_devices,
+            bg=self.accent_color,
+            fg="white",
+            font=("Georgia", 12),
+            relief=tk.RAISED,
+            padx=10,
+            pady=5,
+            state=tk.DISABLED
+        )
+        self.save_all_button.pack(side=tk.LEFT, padx=5)
+        
         # Clear button
         self.clear_button = tk.Button(
             self.buttons_frame,
@@ -115,6 +140,16 @@ class MedicalEmergencyQRGenerator:
         )
         self.clear_button.pack(side=tk.LEFT, padx=5)
         
+        # Live preview toggle
+        self.live_preview_var = tk.BooleanVar(value=False)
+        self.live_preview_check = ttk.Checkbutton(
+            self.buttons_frame,
+            text="Live Preview",
+            variable=self.live_preview_var,
+            command=self.toggle_live_preview
+        )
+        self.live_preview_check.pack(side=tk.LEFT, padx=5)
+        
         # QR Code display frame
         self.qr_frame = ttk.LabelFrame(self.main_frame, text="Flower QR Wallpaper Preview")
         self.qr_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -133,7 +168,7 @@ class MedicalEmergencyQRGenerator:
         
         # Create a frame inside canvas to hold the image
         self.qr_image_frame = tk.Frame(self.qr_canvas, bg=self.secondary_color)
-        self.qr_canvas.create_window((0, 0), window=self.qr_image_frame, anchor=tk.NW)
+        self.qr_canvas_window = self.qr_canvas.create_window((0, 0), window=self.qr_image_frame, anchor=tk.NW)
         
         # QR Code image label
         self.qr_image_label = tk.Label(self.qr_image_frame, bg=self.secondary_color)
@@ -165,6 +200,12 @@ class MedicalEmergencyQRGenerator:
             justify=tk.CENTER
         )
         self.description_label.pack(pady=10)
+        
+        # Previews are drawn directly at display size; live previews use their
+        # own renderer because they run on a background thread
+        self.display_wallpaper = LayeredWallpaper(FloralRenderer.for_width(self.display_width))
+        self.preview_wallpaper = LayeredWallpaper(FloralRenderer.for_width(self.display_width))
+        self.setup_live_preview()
     
     def create_form_field(self, label_text, variable_name, height=1):
         """Create a form field with label and entry widget"""
@@ -209,12 +250,10 @@ class MedicalEmergencyQRGenerator:
     
     def validate_form_data(self, data):
         """Validate that essential fields are filled"""
-        required_fields = ["full_name", "blood_group", "emergency_contact_name", "emergency_contact_phone"]
-        
-        for field in required_fields:
-            if not data.get(field):
-                messagebox.showerror("Validation Error", f"Please fill in the {field.replace('_', ' ')} field.")
-                return False
+        errors = validate_record(data)
+        if errors:
+            messagebox.showerror("Validation Error", errors[0])
+            return False
         
         return True
     
@@ -225,269 +264,152 @@ class MedicalEmergencyQRGenerator:
         if not self.validate_form_data(data):
             return
         
-        # Create QR code data
-        qr_data = {
-            "type": "MEDICAL_EMERGENCY",
-            "personal_info": {
-                "name": data.get("full_name", ""),
-                "dob": data.get("dob", ""),
-                "blood_group": data.get("blood_group", "")
-            },
-            "medical_info": {
-                "allergies": data.get("allergies", ""),
-                "conditions": data.get("medical_conditions", ""),
-                "medications": data.get("medications", "")
-            },
-            "emergency_contact": {
-                "name": data.get("emergency_contact_name", ""),
-                "phone": data.get("emergency_contact_phone", ""),
-                "relationship": data.get("emergency_contact_relation", "")
-            },
-            "address": data.get("address", ""),
-            "additional_info": data.get("additional_info", "")
-        }
-        
-        # Convert to JSON string
-        qr_json = json.dumps(qr_data)
-        
-        # Generate QR code with higher error correction for better design flexibility
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,  # Higher error correction
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_json)
-        qr.make(fit=True)
-        
-        # Create QR code image with custom colors
-        self.qr_image = qr.make_image(fill_color="#060364", back_color="#F9F5E7")
-        
-        # Apply flower theme to QR code
-        self.apply_flower_theme(data.get("emergency_contact_phone", ""))
+        # Draw the preview directly at display size; the full wallpaper is rendered on save
+        self.generated_data = data
+        self.qr_image = None
+        self.preview_image = self.display_wallpaper.update(data)
         
         # Display QR code
         self.display_qr_code()
         
-        # Enable save button
+        # Enable save buttons
         self.save_button.config(state=tk.NORMAL)
+        self.save_all_button.config(state=tk.NORMAL)
     
-    def apply_flower_theme(self, phone_number):
-        """Apply flower theme to the QR code and add emergency phone number"""
-        if not self.qr_image:
-            return
-            
-        # Convert to RGBA if not already
-        if self.qr_image.mode != 'RGBA':
-            self.qr_image = self.qr_image.convert('RGBA')
-            
-        # Create a larger canvas for the wallpaper (16:9 ratio for phones)
-        width, height = 1080, 1920  # Standard phone wallpaper size
-        wallpaper = Image.new('RGBA', (width, height), (249, 245, 231, 255))  # Soft cream background
-        
-        # Calculate QR code size (about 1/3 of wallpaper width)
-        qr_size = width // 2
-        qr_resized = self.qr_image.resize((qr_size, qr_size), Image.LANCZOS)
-        
-        # Place QR code in the center of the upper third
-        qr_position = ((width - qr_size) // 2, height // 4 - qr_size // 2)
-        wallpaper.paste(qr_resized, qr_position, qr_resized)
-        
-        # Add decorative flower elements
-        self.add_flower_decorations(wallpaper)
-        
-        # Add emergency contact information in a decorative banner
-        self.add_emergency_contact_banner(wallpaper, phone_number)
-        
-        # Add medical emergency text
-        self.add_medical_emergency_text(wallpaper)
-        
-        # Save the final wallpaper
-        self.qr_image = wallpaper
-
-    def add_flower_decorations(self, image):
-        """Add flower decorations around the QR code"""
-        width, height = image.size
-        draw = ImageDraw.Draw(image)
-        
-        # Generate flower positions in a circular arrangement around the QR code
-        center_x, center_y = width // 2, height // 4
-        radius = min(width, height) // 3
-        
-        # Draw multiple flowers
-        for i in range(12):
-            angle = math.radians(i * 30)
-            x = center_x + int(radius * math.cos(angle))
-            y = center_y + int(radius * math.sin(angle))
-            
-            # Determine flower size
-            flower_size = random.randint(30, 60)
-            
-            # Choose flower color
-            flower_colors = [
-                (255, 182, 193, 200),  # Light pink
-                (255, 151, 187, 200),  # Pink
-                (221, 160, 221, 200),  # Plum
-                (255, 192, 203, 200),  # Pink
-                (255, 228, 225, 200),  # Misty rose
-            ]
-            
-            color = random.choice(flower_colors)
-            
-            # Draw a flower (simplified as overlapping circles)
-            self.draw_flower(draw, x, y, flower_size, color)
-        
-        # Add some small flowers at the bottom
-        for i in range(20):
-            x = random.randint(0, width)
-            y = random.randint(height // 2, height - 100)
-            
-            flower_size = random.randint(15, 30)
-            color = random.choice(flower_colors)
-            
-            self.draw_flower(draw, x, y, flower_size, color)
+    def display_qr_code(self):
+        """Display the generated QR code"""
+        if self.preview_image:
+            self.show_image(self.preview_image)
     
-    def draw_flower(self, draw, x, y, size, color):
-        """Draw a simple flower using circles"""
-        # Draw petals
-        for angle in range(0, 360, 45):
-            rad = math.radians(angle)
-            offset = size // 2
-            px = x + int(offset * math.cos(rad))
-            py = y + int(offset * math.sin(rad))
-            
-            # Draw petal
-            draw.ellipse((px - size//2, py - size//2, px + size//2, py + size//2), fill=color)
-        
-        # Draw center
-        center_color = (255, 215, 0, 230)  # Gold center
-        draw.ellipse((x - size//3, y - size//3, x + size//3, y + size//3), fill=center_color)
+    def render_full_resolution(self, data):
+        """Render the full-size wallpaper, reusing an earlier render of the same data"""
+        cache_key = renderer_cache_key(self.renderer, data, output=".png")
+        cached = self.render_cache.get(cache_key) if cache_key else None
+        if cached:
+            return Image.open(BytesIO(cached[0]))
+        
+        # Only the layers affected by the edited fields are redrawn
+        image = self.wallpaper.update(data)
+        if cache_key:
+            self.render_cache.put(cache_key, export.encode(image, "png").data, self.wallpaper.metadata())
+        return image
     
-    def add_emergency_contact_banner(self, image, phone_number):
-        """Add emergency contact information in a decorative banner"""
-        width, height = image.size
-        draw = ImageDraw.Draw(image)
-        
-        # Banner position (below QR code)
-        banner_y = height // 2
-        banner_height = 120
-        
-        # Create banner background
-        banner_rect = [0, banner_y, width, banner_y + banner_height]
-        draw.rectangle(banner_rect, fill=(255, 151, 187, 200))  # Semi-transparent pink
-        
-        # Add decorative edges
-        edge_height = 20
-        for i in range(edge_height):
-            alpha = 150 * (1 - i/edge_height)
-            edge_color = (255, 151, 187, int(alpha))
-            draw.rectangle([0, banner_y - i, width, banner_y - i + 1], fill=edge_color)
-            draw.rectangle([0, banner_y + banner_height + i - 1, width, banner_y + banner_height + i], fill=edge_color)
-        
-        # Add emergency text
-        try:
-            # Try to load a nice font, fall back to default if not available
-            font_large = ImageFont.truetype("Georgia", 48)
-            font_small = ImageFont.truetype("Georgia", 36)
-        except IOError:
-            # Use default font if custom font not available
-            font_large = ImageFont.load_default()
-            font_small = ImageFont.load_default()
-        
-        # Add "EMERGENCY CONTACT" text
-        text = "EMERGENCY CONTACT"
-        draw.text((width//2, banner_y + 20), text, fill=(255, 255, 255), font=font_small, anchor="mm")
-        
-        # Add phone number in larger, bold font
-        draw.text((width//2, banner_y + 70), phone_number, fill=(255, 255, 255), font=font_large, anchor="mm")
-        
-    def add_medical_emergency_text(self, image):
-        """Add medical emergency text at the top of the image"""
-        width, height = image.size
-        draw = ImageDraw.Draw(image)
+    def setup_live_preview(self):
+        """Re-render a preview in the background as the form is edited"""
+        self.live_preview = LivePreview(self.root, self.get_preview_data, self.render_preview, self.show_preview,
+                                        on_edit=self.mark_stale)
+        variables = [getattr(self, field + "_var") for field in FORM_FIELDS if hasattr(self, field + "_var")]
+        text_widgets = [getattr(self, field) for field in FORM_FIELDS if isinstance(getattr(self, field, None), tk.Text)]
+        self.live_preview.watch(variables, text_widgets)
+    
+    def toggle_live_preview(self):
+        """Turn the live preview on or off"""
+        self.live_preview.set_enabled(self.live_preview_var.get())
+    
+    def get_preview_data(self):
+        """Form data for the live preview, or None while required fields are empty"""
+        data = self.get_form_data()
+        return None if validate_record(data) else data
+    
+    def render_preview(self, data):
+        """Render a display-size wallpaper (runs on the preview worker thread)"""
+        return self.preview_wallpaper.update(data)
+    
+    def show_preview(self, image, data):
+        """Show a finished preview and make its data the wallpaper that gets saved"""
+        self.generated_data = data
+        self.qr_image = None
+        self.preview_image = image
+        self.show_image(image)
+        self.save_button.config(state=tk.NORMAL)
+        self.save_all_button.config(state=tk.NORMAL)
+    
+    def mark_stale(self):
+        """Stop saving the last generated wallpaper once the form no longer matches it"""
+        self.generated_data = None
+        self.save_button.config(state=tk.DISABLED)
+        self.save_all_button.config(state=tk.DISABLED)
+    
+    def show_image(self, img):
+        """Show a display-size wallpaper in the preview area"""
+        # Remove all widgets from the QR image frame
+        for widget in self.qr_image_frame.winfo_children():
+            widget.destroy()
         
-        try:
-            font = ImageFont.truetype("Georgia", 42)
-        except IOError:
-            font = ImageFont.load_default()
-            
-        text = "MEDICAL EMERGENCY INFO"
-        text_width, text_height = draw.textsize(text, font=font) if hasattr(draw, 'textsize') else (400, 50)
+        # Hide description label if it exists
+        if hasattr(self, 'description_label') and self.description_label:
+            self.description_label.pack_forget()
         
-        # Position text at the top
-        y_position = height // 10
+        self.photo_image = ImageTk.PhotoImage(img)
         
-        # Add a slight glow effect
-        for offset in range(3, 0, -1):
-            draw.text((width//2 - text_width//2 + offset, y_position + offset), 
-                      text, fill=(0, 0, 0, 50), font=font)
+        # Display image in the label
+        self.qr_image_label = tk.Label(self.qr_image_frame, image=self.photo_image, bg=self.secondary_color)
+        self.qr_image_label.image = self.photo_image  # Keep a reference
+        self.qr_image_label.pack(pady=10)
         
-        # Draw main text
-        draw.text((width//2, y_position), text, fill=(136, 176, 75), font=font, anchor="mm")
-
-    def display_qr_code(self):
-        """Display the generated QR code"""
-        if self.qr_image:
-            # Remove all widgets from the QR image frame
-            for widget in self.qr_image_frame.winfo_children():
-                widget.destroy()
-            
-            # Hide description label if it exists
-            if hasattr(self, 'description_label') and self.description_label:
-                self.description_label.pack_forget()
-            
-            # Resize image for display while maintaining aspect ratio
-            display_width = 400
-            aspect_ratio = self.qr_image.height / self.qr_image.width
-            display_height = int(display_width * aspect_ratio)
-            
-            img = self.qr_image.resize((display_width, display_height), Image.LANCZOS)
-            self.photo_image = ImageTk.PhotoImage(img)
-            
-            # Display image in the label
-            self.qr_image_label = tk.Label(self.qr_image_frame, image=self.photo_image, bg=self.secondary_color)
-            self.qr_image_label.image = self.photo_image  # Keep a reference
-            self.qr_image_label.pack(pady=10)
-            
-            # Update canvas scroll region
-            self.qr_image_frame.update_idletasks()
-            self.qr_canvas.config(scrollregion=self.qr_canvas.bbox("all"))
-            
-            # Center the content in the canvas
-            self.center_frame_in_canvas()
+        # Update canvas scroll region
+        self.qr_image_frame.update_idletasks()
+        self.qr_canvas.config(scrollregion=self.qr_canvas.bbox("all"))
+        
+        # Center the content in the canvas
+        self.center_frame_in_canvas()
+    
+    def center_frame_in_canvas(self):
+        """Center the image frame horizontally in the preview canvas"""
+        x = max(0, (self.qr_canvas.winfo_width() - self.qr_image_frame.winfo_reqwidth()) // 2)
+        self.qr_canvas.coords(self.qr_canvas_window, x, 0)
     
     def save_qr_code(self):
         """Save the QR code to a file"""
-        if not self.qr_image:
+        if not self.generated_data:
             messagebox.showerror("Error", "No QR code wallpaper has been generated yet.")
             return
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("All files", "*.*")],
+            filetypes=[("PNG files", "*.png"), ("WebP files", "*.webp"), ("JPEG files", "*.jpg"), ("All files", "*.*")],
             title="Save Flower QR Wallpaper"
         )
         
         if file_path:
             try:
-                # For JPEG format, convert to RGB (no alpha channel)
-                if file_path.lower().endswith('.jpg') or file_path.lower().endswith('.jpeg'):
-                    if self.qr_image.mode == 'RGBA':
-                        rgb_image = Image.new('RGB', self.qr_image.size, (255, 255, 255))
-                        rgb_image.paste(self.qr_image, mask=self.qr_image.split()[3])
-                        rgb_image.save(file_path, quality=95)
-                    else:
-                        self.qr_image.save(file_path, quality=95)
-                else:
-                    self.qr_image.save(file_path)
+                self.qr_image = self.render_full_resolution(self.generated_data)
+                
+                # The encoder preset follows the file extension
+                saved = export.save(self.qr_image, file_path)
                     
                 messagebox.showinfo("Success", 
-                    f"Flower QR wallpaper saved to {file_path}\n\n"
+                    f"Flower QR wallpaper saved to {file_path} ({len(saved) / 1024:.0f} KB)\n\n"
                     f"Set this image as your phone's lock screen wallpaper for emergency access."
                 )
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save wallpaper: {str(e)}")
     
+    def save_all_devices(self):
+        """Save the wallpaper once for every common phone and tablet size"""
+        if not self.generated_data:
+            messagebox.showerror("Error", "No QR code wallpaper has been generated yet.")
+            return
+        
+        directory = filedialog.askdirectory(title="Choose a Folder for the Wallpapers")
+        if not directory:
+            return
+        
+        try:
+            # One QR encoding is shared by every size
+            targets = MultiTargetRenderer(list(DEVICE_PRESETS.values()))
+            results = targets.render(self.generated_data)
+            for name, size in DEVICE_PRESETS.items():
+                width, height = size
+                export.save(results[size].image, os.path.join(directory, f"flower_qr_{name}_{width}x{height}.png"))
+            
+            messagebox.showinfo("Success",
+                f"Saved {len(DEVICE_PRESETS)} wallpapers to {directory}\n\n"
+                f"Use the one matching your device's screen as its lock screen wallpaper."
+            )
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save wallpapers: {str(e)}")
+    
     def clear_form(self):
         """Clear all form fields"""
         # Clear StringVar fields
@@ -528,13 +450,19 @@ class MedicalEmergencyQRGenerator:
             # Reset description visibility
             self.description_label.pack(pady=10)
         
-        # Disable save button
+        # Disable save buttons
         self.save_button.config(state=tk.DISABLED)
+        self.save_all_button.config(state=tk.DISABLED)
         
         # Reset QR image
         self.qr_image = None
+        self.preview_image = None
+        self.generated_data = None
         self.photo_image = None
         
+        # Forget earlier renders along with the data they show
+        self.render_cache.clear()
+        
         # Show confirmation
         messagebox.showinfo("Form Cleared", "All form fields have been cleared.")
 
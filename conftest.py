@@ -0,0 +1,2 @@
+# Having a conftest.py at the repository root puts the root on sys.path when
+# pytest runs, so the tests import lifetag without installing it.
@@ -0,0 +1,6 @@
+"""LifeTag rendering engine, usable without the Tkinter desktop apps.
+
+Import from the submodules, e.g. `from lifetag.engine import FloralRenderer`.
+Keeping this file free of imports lets `python -m lifetag.<module>` run the
+command-line entry points cleanly.
+"""
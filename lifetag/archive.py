@@ -0,0 +1,102 @@
+"""Stream rendered tags straight into a ZIP or tar archive.
+
+Encoded images go from memory into the archive, so a batch of millions of
+tags creates one file instead of millions of small ones, which is what
+slows down network file systems. A manifest.jsonl listing every file with
+its record id, payload hash and QR version is added when the archive is
+closed. Manifest lines are spooled to a temporary file as files are added
+and copied into the archive at the end, so memory stays flat however many
+records go through.
+"""
+import io
+import json
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz")
+
+
+def detect_archive_format(path):
+    """Guess the archive format from a file name"""
+    lower = path.lower()
+    if lower.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if lower.endswith(".tar"):
+        return "tar"
+    return "zip"
+
+
+class ArchiveWriter:
+    """Write encoded files and a manifest into a ZIP or tar archive"""
+
+    def __init__(self, path, archive_format=None, manifest_name="manifest.jsonl"):
+        self.path = path
+        self.archive_format = archive_format or detect_archive_format(path)
+        self.manifest_name = manifest_name
+        self.count = 0
+        self.bytes_written = 0
+        self._manifest = tempfile.TemporaryFile()
+
+        if self.archive_format == "zip":
+            # PNG and JPEG data is already compressed; deflating it again only costs time
+            self._archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        elif self.archive_format in ("tar", "tar.gz"):
+            mode = "w:gz" if self.archive_format == "tar.gz" else "w"
+            self._archive = tarfile.open(path, mode)
+        else:
+            raise ValueError(f"Unknown archive format '{archive_format}', expected one of: {', '.join(ARCHIVE_FORMATS)}")
+
+    def _write(self, name, data):
+        self._write_file(name, io.BytesIO(data), len(data))
+
+    def _write_file(self, name, file, size):
+        """Copy size bytes from a file object into the archive"""
+        if self.archive_format == "zip":
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = size
+            with self._archive.open(info, "w", force_zip64=size > zipfile.ZIP64_LIMIT) as target:
+                shutil.copyfileobj(file, target)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = int(time.time())
+            self._archive.addfile(info, file)
+
+    def add(self, name, data, entry=None):
+        """Add one encoded file; entry is the batch report entry it came from"""
+        self._write(name, data)
+        self.count += 1
+        self.bytes_written += len(data)
+
+        entry = entry or {}
+        row = {
+            "file": name,
+            "id": entry.get("id", ""),
+            "payload_hash": entry.get("payload_hash", ""),
+            "version": entry.get("version"),
+            "bytes": len(data),
+        }
+        self._manifest.write((json.dumps(row) + "\n").encode("utf-8"))
+
+    def close(self):
+        if self._archive is None:
+            return
+        try:
+            size = self._manifest.tell()
+            self._manifest.seek(0)
+            self._write_file(self.manifest_name, self._manifest, size)
+            self._archive.close()
+        finally:
+            self._manifest.close()
+            self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,422 @@
+"""Batch LifeTag generation from CSV or JSONL files.
+
+Usage:
+    python -m lifetag.batch employees.csv -o tags --theme floral
+    python -m lifetag.batch employees.csv --archive tags.zip
+    hr-export | python -m lifetag.batch - --input-format csv --rejects rejects.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack
+
+from . import export, instrument
+from .archive import ArchiveWriter
+from .cache import RenderCache, renderer_cache_key
+from .engine import get_renderer
+from .ingest import RejectWriter, iter_records, valid_records
+from .layout import FlowerLayout
+from .payload import PAYLOAD_FORMATS
+from .qrcache import qr_cache
+from .settings import Settings, get_settings
+from .store import RecordStore, stored_records
+from .targets import MultiTargetRenderer, parse_targets
+from .verify import verify_render
+
+
+# Errors kept on BatchStats; the rest are only counted
+MAX_ERRORS = 100
+
+
+def record_name(index, data):
+    """Build a file-system safe base name for a record"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(data.get("id") or data.get("full_name", ""))).strip("_")
+    return f"{index:06d}_{slug}" if slug else f"{index:06d}"
+
+
+def write_to_sink(entry, sink):
+    """Move the encoded files of an in-memory report entry into an archive"""
+    files = entry.pop("files")
+    for filename, encoded in files.items():
+        sink.add(filename, encoded, entry)
+    entry["paths"] = list(files)
+
+
+class BatchStats:
+    """Counters and timing for a batch run"""
+
+    def __init__(self):
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+        self.output_bytes = 0
+        self.unsafe = 0
+        self.errors = []
+        self.warnings = []
+
+    def add_rendered(self, entry):
+        """Count a rendered record's output, and whether its QR code failed verification"""
+        self.rendered += 1
+        self.output_bytes += entry["bytes"]
+        verified = entry.get("verify")
+        if verified and not verified["ok"]:
+            self.unsafe += 1
+            if len(self.warnings) < MAX_ERRORS:
+                self.warnings.append((entry["index"], verified["problems"]))
+
+    def add_error(self, index, errors):
+        """Count a failed record, keeping the first few errors for reporting"""
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((index, errors))
+
+    @property
+    def total(self):
+        return self.rendered + self.failed
+
+    @property
+    def records_per_second(self):
+        return self.rendered / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "records_per_second": round(self.records_per_second, 2),
+            "output_bytes": self.output_bytes,
+            "unsafe": self.unsafe,
+        }
+
+
+class BatchGenerator:
+    """Render many records to QR PNGs and wallpapers without a GUI
+
+    With output_dir=None nothing is written; render_one returns the encoded
+    files in its report entry for an archive sink instead.
+    """
+
+    def __init__(self, theme="floral", output_dir="lifetag_output", image_format="png",
+                 save_qr=False, emergency_number=None, seed=0, payload_format="json",
+                 cache_dir=None, cache_size=None, error_correction=None, qr_cache_dir=None, targets=None,
+                 profiles=None, verify=False, layout=None):
+        kwargs = {"payload_format": payload_format, "error_correction": error_correction}
+        if emergency_number is not None:
+            kwargs["emergency_number"] = emergency_number
+        if theme == "floral":
+            kwargs["decoration_seed"] = seed
+            kwargs["decoration_layout"] = layout
+        self.renderer = get_renderer(theme, **kwargs)
+        # Several wallpaper sizes per record, sharing one QR encoding
+        self.targets = None
+        if targets:
+            if theme != "floral":
+                raise ValueError("Target sizes are only supported by the floral theme")
+            self.targets = MultiTargetRenderer(targets, **kwargs)
+        # Renderer options of each settings profile a record can select; built on first use
+        self.profiles = profiles or {}
+        self._renderer_options = kwargs
+        self._profile_renderers = {}
+        self.output_dir = output_dir
+        self.image_format = export.parse_preset(image_format)
+        self.save_qr = save_qr
+        self.verify = verify
+        if qr_cache_dir:
+            qr_cache.directory = qr_cache_dir
+        self.cache = None
+        if cache_dir:
+            self.cache = RenderCache(cache_dir, **({"max_bytes": cache_size} if cache_size else {}))
+
+    def renderers_for(self, data):
+        """(renderer, multi-target renderer or None) for the settings profile a record selects"""
+        name = data.get("profile")
+        if not name:
+            return self.renderer, self.targets
+        if name not in self._profile_renderers:
+            if name not in self.profiles:
+                raise ValueError(f"Unknown settings profile '{name}'")
+            options = dict(self._renderer_options, **self.profiles[name])
+            targets = MultiTargetRenderer(self.targets.targets, **options) if self.targets else None
+            self._profile_renderers[name] = (get_renderer(self.renderer.theme, **options), targets)
+        return self._profile_renderers[name]
+
+    def payload_hash(self, data):
+        """Hash of the QR payload a record renders to, as reported in its metadata"""
+        renderer, _targets = self.renderers_for(data)
+        payload = renderer.encode_payload(renderer.build_qr_data(data))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def verify_results(self, renderer, targets, results):
+        """Verify every rendered image, returning the worst result"""
+        if not targets:
+            return verify_render(renderer, results[0])
+        worst = None
+        for target, result in zip(targets.renderers, results):
+            verified = dict(verify_render(target, result), target=f"{target.width}x{target.height}")
+            if worst is None or (verified["ok"], -verified["budget_used"]) < (worst["ok"], -worst["budget_used"]):
+                worst = verified
+        return worst
+
+    def encode_image(self, image, image_format=None):
+        """Encode an image with an export preset, returning an EncodedImage"""
+        return export.encode(image, image_format or self.image_format)
+
+    def output_suffixes(self):
+        """File name suffixes written for every record"""
+        extension = export.extension(self.image_format)
+        if self.targets:
+            suffixes = [f"_{width}x{height}.{extension}" for width, height in self.targets.targets]
+        else:
+            suffixes = [f".{extension}"]
+        # The floral theme can also keep the bare QR code next to the wallpaper
+        if self.save_qr and self.renderer.theme != "standard":
+            suffixes.append("_qr.png")
+        return suffixes
+
+    def render_files(self, data):
+        """Render a record into {suffix: encoded bytes} plus its QR metadata"""
+        suffixes = self.output_suffixes()
+        renderer, targets = self.renderers_for(data)
+        keys = {}
+        if self.cache:
+            # Automatic error correction depends on the smallest target, so the set is part of the key
+            extra = {"encoder": self.image_format}
+            if targets:
+                extra["targets"] = targets.targets
+            for suffix in suffixes:
+                key = renderer_cache_key(renderer, data, output=suffix, **extra)
+                if key:
+                    keys[suffix] = key
+
+        if keys:
+            cached = {suffix: self.cache.get(key) for suffix, key in keys.items()}
+            # Renders cached without verification are redone when it's asked for
+            if all(cached.values()) and (not self.verify or "verify" in (cached[suffixes[0]][1] or {})):
+                files = {suffix: entry[0] for suffix, entry in cached.items()}
+                metadata = cached[suffixes[0]][1]
+                return files, dict(metadata, cached=True)
+
+        if targets:
+            results = list(targets.render(data).values())
+            encoded = {suffix: self.encode_image(result.image) for suffix, result in zip(suffixes, results)}
+            result = results[0]
+        else:
+            result = renderer.render(data)
+            encoded = {suffixes[0]: self.encode_image(result.image)}
+        if "_qr.png" in suffixes:
+            encoded["_qr.png"] = self.encode_image(result.qr_image, "png")
+        files = {suffix: image.data for suffix, image in encoded.items()}
+        metadata = result.metadata()
+        if self.verify:
+            metadata["verify"] = self.verify_results(renderer, targets, results if targets else [result])
+
+        for suffix, key in keys.items():
+            self.cache.put(key, files[suffix], metadata)
+        encode_ms = sum(image.seconds for image in encoded.values()) * 1000
+        return files, dict(metadata, encode_ms=round(encode_ms, 2))
+
+    def render_one(self, index, data):
+        """Render and save a single record, returning a report entry"""
+        name = record_name(index, data)
+        files, metadata = self.render_files(data)
+        report = {"index": index, "name": name, "id": data.get("id", "")}
+        report.update(metadata)
+        report["bytes"] = sum(len(encoded) for encoded in files.values())
+
+        if self.output_dir is None:
+            report["files"] = {name + suffix: encoded for suffix, encoded in files.items()}
+            return report
+
+        paths = []
+        for suffix, encoded in files.items():
+            path = os.path.join(self.output_dir, name + suffix)
+            with open(path, "wb") as file:
+                file.write(encoded)
+            paths.append(path)
+        report["paths"] = paths
+        return report
+
+    def run(self, records, progress=None, report=None, sink=None):
+        """Render every record and return a BatchStats
+
+        records yields (line number, form data) pairs of valid records, as
+        valid_records() does; the line number names the record in errors,
+        the report and the file names, matching the reject file.
+        report, if given, is called with the report entry of every rendered record.
+        sink, if given, receives the encoded files instead of output_dir.
+        """
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+        stats = BatchStats()
+        start = time.perf_counter()
+
+        for index, data in records:
+            try:
+                entry = self.render_one(index, data)
+                if sink:
+                    write_to_sink(entry, sink)
+                stats.add_rendered(entry)
+                if report:
+                    report(entry)
+            except Exception as e:
+                stats.add_error(index, [str(e)])
+
+            if progress:
+                stats.elapsed = time.perf_counter() - start
+                progress(stats)
+
+        stats.elapsed = time.perf_counter() - start
+        return stats
+
+
+def store_report(store, report=None):
+    """Wrap a report callback to record each render's payload hash and artifact in the store"""
+    def record(entry):
+        store.mark_rendered(entry["id"], entry.get("payload_hash"), entry["paths"][0])
+        if report:
+            report(entry)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate LifeTag QR codes and wallpapers in bulk.")
+    parser.add_argument("input", help="CSV or JSONL file with one record per row, or - for stdin")
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], help="input format (default: from the file name)")
+    parser.add_argument("--rejects", help="write invalid rows and the reasons to this JSONL file")
+    parser.add_argument("-o", "--output-dir", default="lifetag_output", help="directory for rendered images")
+    parser.add_argument("--archive", help="stream images into this .zip, .tar or .tar.gz instead of a directory")
+    parser.add_argument("--theme", default="floral", choices=["standard", "floral"])
+    parser.add_argument("--format", default="png", choices=list(export.PRESETS),
+                        help="image encoder preset: png, png-fast, png-small, jpg, webp or webp-small")
+    parser.add_argument("--save-qr", action="store_true", help="also save the bare QR code PNG")
+    parser.add_argument("--targets", help="floral wallpaper sizes to export per record, e.g. "
+                        "720x1280,1080@20:9,tablet (default: 1080x1920)")
+    parser.add_argument("--emergency-number", help="emergency number embedded by the standard theme "
+                        "(default: from the settings profile)")
+    parser.add_argument("--profile", help="settings profile for the emergency number (default: the active one); "
+                        "records can also name their own in a profile column")
+    parser.add_argument("--settings", help="settings file (default: the per-user one the apps use)")
+    parser.add_argument("--payload-format", default="json", choices=PAYLOAD_FORMATS,
+                        help="QR payload encoding (compact and base45 give smaller QR codes)")
+    parser.add_argument("--error-correction", choices=["L", "M", "Q", "H", "auto"],
+                        help="QR error correction level (default: the theme's; auto picks per record)")
+    parser.add_argument("--verify", action="store_true",
+                        help="read every QR code back from the finished image and flag unsafe ones")
+    parser.add_argument("--report", help="write QR version and module count per record to this JSONL file")
+    parser.add_argument("--cache-dir", help="reuse renders of unchanged records from this cache directory")
+    parser.add_argument("--cache-size", type=int, default=256, help="render cache limit in MB")
+    parser.add_argument("--qr-cache-dir", help="share encoded QR codes between runs and themes in this directory")
+    parser.add_argument("--store", help="keep records in this SQLite store and only render the ones changed "
+                        "since their last render (encrypted with $LIFETAG_STORE_KEY if set)")
+    parser.add_argument("--render-all", action="store_true", help="with --store, render unchanged records too")
+    parser.add_argument("--seed", type=int, default=0, help="flower layout seed for the floral theme")
+    parser.add_argument("--layout", help="flower layout JSON from python -m lifetag.layout (replaces --seed)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="render in N worker processes (0 uses every core)")
+    parser.add_argument("--metrics-jsonl", help="append per-stage timing events to this JSONL file")
+    parser.add_argument("--metrics-prom", help="write per-stage timing metrics to this Prometheus text file")
+    args = parser.parse_args(argv)
+    try:
+        targets = parse_targets(args.targets) if args.targets else None
+    except ValueError as e:
+        parser.error(str(e))
+    if targets and args.theme != "floral":
+        parser.error("--targets needs the floral theme")
+    layout = None
+    if args.layout:
+        if args.theme != "floral":
+            parser.error("--layout needs the floral theme")
+        try:
+            layout = FlowerLayout.load(args.layout)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"Couldn't read layout {args.layout}: {e}")
+
+    # Settings are read once; records switch profiles without touching the disk again
+    settings = Settings(args.settings) if args.settings else get_settings()
+    if settings.load_error:
+        print(f"warning: {settings.load_error}", file=sys.stderr)
+    try:
+        profile = settings.profile(args.profile)
+    except KeyError as e:
+        parser.error(e.args[0])
+    emergency_number = args.emergency_number
+    profiles = {name: {} for name in settings.profiles}
+    if args.theme == "standard" and emergency_number is None:
+        emergency_number = profile["emergency_number"]
+        profiles = {name: {"emergency_number": settings.get("emergency_number", name)} for name in settings.profiles}
+
+    options = {
+        "theme": args.theme,
+        "output_dir": None if args.archive else args.output_dir,
+        "image_format": args.format,
+        "save_qr": args.save_qr,
+        "emergency_number": emergency_number,
+        "seed": args.seed,
+        "payload_format": args.payload_format,
+        "error_correction": args.error_correction,
+        "cache_dir": args.cache_dir,
+        "cache_size": args.cache_size * 1024 * 1024,
+        "qr_cache_dir": args.qr_cache_dir,
+        "targets": targets,
+        "profiles": profiles,
+        "verify": args.verify,
+        "layout": layout,
+    }
+    if args.workers == 1:
+        generator = BatchGenerator(**options)
+    else:
+        from .parallel import ParallelBatchGenerator
+        generator = ParallelBatchGenerator(workers=args.workers or None, **options)
+
+    with ExitStack() as stack:
+        rejects = stack.enter_context(RejectWriter(args.rejects))
+        sink = stack.enter_context(ArchiveWriter(args.archive)) if args.archive else None
+        prometheus = None
+        if args.metrics_jsonl:
+            events = stack.enter_context(instrument.JsonLinesExporter(args.metrics_jsonl))
+            instrument.add_hook(events)
+            stack.callback(instrument.remove_hook, events)
+        if args.metrics_prom:
+            prometheus = instrument.add_hook(instrument.PrometheusExporter(args.metrics_prom))
+            stack.callback(instrument.remove_hook, prometheus)
+        report = None
+        if args.report:
+            report_file = stack.enter_context(open(args.report, "w", encoding="utf-8"))
+            report = lambda entry: report_file.write(json.dumps(entry) + "\n")
+
+        # Records stream from the input through validation into the renderer
+        records = iter_records(args.input, args.input_format)
+        if args.store:
+            try:
+                store = stack.enter_context(RecordStore(args.store))
+            except (RuntimeError, ValueError) as e:
+                parser.error(str(e))
+            # The payload each record would get now decides whether its last render still holds
+            planner = generator
+            if not isinstance(planner, BatchGenerator):
+                planner = BatchGenerator(**dict(options, cache_dir=None))
+            records = stored_records(records, store, only_changed=not args.render_all,
+                                     payload_hash=planner.payload_hash)
+            report = store_report(store, report)
+        records = valid_records(records, rejects)
+        stats = generator.run(records, report=report, sink=sink)
+        stats.rejected = rejects.count
+        if prometheus:
+            prometheus.write()
+
+    for index, errors in stats.errors:
+        print(f"record {index}: {'; '.join(errors)}", file=sys.stderr)
+    for index, problems in stats.warnings:
+        print(f"record {index}: unsafe QR code: {'; '.join(problems)}", file=sys.stderr)
+    print(json.dumps(stats.as_dict()))
+    return 1 if stats.failed or stats.rejected or stats.unsafe else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
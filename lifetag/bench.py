@@ -0,0 +1,212 @@
+"""Per-stage benchmark of the LifeTag rendering pipeline.
+
+Usage:
+    python -m lifetag.bench -o before.json
+    python -m lifetag.bench -o after.json --compare before.json
+
+Every stage of the pipeline is timed separately (payload serialization, QR
+encoding at L and H, rasterization, decorations, banner, title text,
+compositing, PNG/JPEG encoding and a full render) on synthetic records of
+increasing payload size. Results are written as JSON; --compare reports the
+change against an earlier run and exits with status 1 when a stage got
+slower than the threshold, so regressions can fail a CI job before deploy.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import numpy
+import PIL
+import qrcode
+
+from .batch import BatchGenerator
+from .decorations import decoration_cache, render_decoration_layer
+from .engine import FloralRenderer, StandardRenderer
+from .layout import generate_layout
+from .payload import encode_payload
+from .qrcache import QRCodeCache
+from .raster import rasterize_matrix
+from .verify import verify_qr
+
+
+# Extra characters of free text added to the base record for each case; the
+# largest still fits a version 40 QR code at error correction level H
+DEFAULT_SIZES = [0, 250, 500, 800]
+
+
+def synthetic_record(extra_chars):
+    """A complete form record padded with extra_chars of additional info"""
+    notes = ("Carries an epinephrine auto-injector in the left pocket. " * (extra_chars // 56 + 1))[:extra_chars]
+    return {
+        "full_name": "Alexandra Benchmark",
+        "dob": "1985-06-15",
+        "blood_group": "AB-",
+        "allergies": "Penicillin, peanuts",
+        "medical_conditions": "Type 1 diabetes",
+        "medications": "Insulin glargine 20u nightly",
+        "emergency_contact_name": "Jordan Benchmark",
+        "emergency_contact_phone": "+1 555 0100",
+        "emergency_contact_relation": "Partner",
+        "address": "42 Example Road, Springfield",
+        "additional_info": notes,
+    }
+
+
+def time_stage(func, repeat):
+    """Run func repeat times after a warm-up call, returning timings in ms"""
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3)}
+
+
+def benchmark_record(data, repeat=5):
+    """Time every pipeline stage for one record"""
+    standard = StandardRenderer()
+    floral = FloralRenderer()
+    uncached = FloralRenderer(cache_background=False)
+    writer = BatchGenerator(theme="floral", output_dir=None)
+    # Encoding stages measure the encoder itself, not the QR cache
+    for renderer in (standard, floral, uncached):
+        renderer.qr_cache = QRCodeCache(max_entries=0)
+    cached = FloralRenderer()
+
+    qr_data = floral.build_qr_data(data)
+    payload = floral.encode_payload(qr_data)
+    qr_l = standard.make_qr(payload)
+    standard_image = standard.make_qr_image(qr_l)
+    qr_h = floral.make_qr(payload)
+    qr_image = floral.make_qr_image(qr_h)
+    phone = data["emergency_contact_phone"]
+    layers = [floral.qr_layer(qr_image), floral.banner_layer(phone), floral.title_layer()]
+    wallpaper = floral.compose_layers(layers)
+    qr_size = floral.qr_pixel_size(qr_h)
+
+    legacy_qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H)
+    legacy_qr.add_data(payload)
+    legacy_qr.make(fit=True)
+
+    def legacy_resize():
+        # The original path: qrcode's PIL image scaled with LANCZOS
+        image = legacy_qr.make_image(fill_color=floral.fill_color, back_color=floral.back_color).convert("RGBA")
+        image.resize((qr_size, qr_size), PIL.Image.LANCZOS)
+
+    stages = {
+        # The serializer the renderers call, in each payload format
+        "encode_payload": lambda: encode_payload(qr_data, "json"),
+        "encode_payload_compact": lambda: encode_payload(qr_data, "compact"),
+        "encode_payload_base45": lambda: encode_payload(qr_data, "base45"),
+        "qr_make_L": lambda: standard.make_qr(payload),
+        "qr_make_H": lambda: floral.make_qr(payload),
+        "qr_make_cached": lambda: cached.make_qr(payload),
+        "qrcode_make_image_lanczos": legacy_resize,
+        "rasterize_standard": lambda: standard.make_qr_image(qr_l),
+        "rasterize_floral": lambda: rasterize_matrix(qr_h, qr_size, floral.fill_color, floral.back_color),
+        "layout": lambda: generate_layout(floral.decoration_seed, floral.reference_zones()),
+        "decorations": lambda: render_decoration_layer(floral.width, floral.height, floral.flower_layout()),
+        "background_uncached": lambda: uncached.make_background(floral.width, floral.height),
+        "background_cached": lambda: floral.make_background(floral.width, floral.height),
+        "banner": lambda: floral.banner_layer(phone),
+        "title_text": floral.title_layer,
+        "composite": lambda: floral.compose_layers(layers),
+        "verify": lambda: verify_qr(wallpaper, qr_h, floral.qr_placement(qr_h)),
+        "encode_png": lambda: writer.encode_image(wallpaper, "png"),
+        "encode_png_fast": lambda: writer.encode_image(wallpaper, "png-fast"),
+        "encode_jpeg": lambda: writer.encode_image(wallpaper, "jpg"),
+        "encode_webp": lambda: writer.encode_image(wallpaper, "webp"),
+        "encode_standard_png": lambda: writer.encode_image(standard_image, "png"),
+        "render_standard": lambda: standard.render(data),
+        "render_floral": lambda: floral.render(data),
+    }
+
+    return {
+        "payload_bytes": len(payload.encode("utf-8")),
+        "version_L": qr_l.version,
+        "version_H": qr_h.version,
+        "stages": {name: time_stage(func, repeat) for name, func in stages.items()},
+    }
+
+
+def run_benchmarks(sizes=None, repeat=5):
+    """Benchmark every payload size, returning a JSON-serializable result"""
+    cases = {}
+    for extra_chars in sizes or DEFAULT_SIZES:
+        cases[f"extra_{extra_chars}"] = benchmark_record(synthetic_record(extra_chars), repeat)
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": PIL.__version__,
+            "numpy": numpy.__version__,
+            "qrcode": getattr(qrcode, "__version__", "unknown"),
+        },
+        "repeat": repeat,
+        "decoration_cache": decoration_cache.stats(),
+        "cases": cases,
+    }
+
+
+def compare(current, baseline, threshold=0.10, metric="min_ms", min_delta_ms=1.0):
+    """Compare two results, returning rows of (case, stage, before, after, change, regressed)
+
+    Changes smaller than min_delta_ms are never counted as regressions, since
+    sub-millisecond stages are dominated by timer noise.
+    """
+    rows = []
+    for case, result in current["cases"].items():
+        before_stages = baseline.get("cases", {}).get(case, {}).get("stages", {})
+        for stage, timing in result["stages"].items():
+            if stage not in before_stages:
+                continue
+            before = before_stages[stage][metric]
+            after = timing[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = change > threshold and after - before >= min_delta_ms
+            rows.append((case, stage, before, after, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the LifeTag renderer.")
+    parser.add_argument("-o", "--output", help="write results to this JSON file (default: stdout)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated extra payload characters per case")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument("--metric", default="min_ms", choices=["min_ms", "median_ms"],
+                        help="timing compared against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run_benchmarks(sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = 0
+    for case, stage, before, after, change, regressed in compare(results, baseline, args.threshold, args.metric):
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{case:>12} {stage:<28} {before:>10.3f} -> {after:>10.3f} ms  {change:+7.1%}{flag}",
+              file=sys.stderr)
+        regressions += regressed
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
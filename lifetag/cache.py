@@ -0,0 +1,235 @@
+"""Content-addressed, disk-backed cache of rendered LifeTags.
+
+Entries are keyed by a SHA-256 of the canonical qr_data JSON plus every
+renderer option that changes the output (theme, error correction level,
+output size, ...). A hit returns the stored encoded image without running
+the QR encoder or the wallpaper pipeline. The cache is bounded in bytes and
+evicts the least recently used entries, using file modification times so
+the LRU order survives restarts and is shared between processes.
+
+MemoryRenderCache has the same interface but keeps entries in the process
+only, for callers such as the desktop apps that shouldn't leave rendered
+medical data on disk.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from .fileio import write_atomic
+
+
+DATA_SUFFIX = ".img"
+META_SUFFIX = ".json"
+
+
+def default_cache_dir():
+    """Per-user cache directory for rendered tags"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "lifetag", "renders")
+
+
+def render_key(qr_data, **options):
+    """Hash the payload and render options into a cache key"""
+    canonical = json.dumps({"qr_data": qr_data, "options": options}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def renderer_cache_key(renderer, data, **extra):
+    """Cache key for rendering form data with a renderer, or None if the output isn't reproducible"""
+    options = renderer.render_options()
+    if options is None:
+        return None
+    options.update(extra)
+    return render_key(renderer.build_qr_data(data), **options)
+
+
+class RenderCache:
+    """Size-bounded LRU store of encoded images on disk"""
+
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.total_bytes = sum(size for _path, size, _mtime in self._entries())
+
+    def _path(self, key, suffix):
+        # Shard by key prefix to keep directories small
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def _entries(self):
+        """Yield (data path, bytes including metadata, last use time) for every entry"""
+        for dirpath, _dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(DATA_SUFFIX):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                size = stat.st_size
+                meta_path = path[:-len(DATA_SUFFIX)] + META_SUFFIX
+                if os.path.exists(meta_path):
+                    size += os.path.getsize(meta_path)
+                yield path, size, stat.st_mtime
+
+    def get(self, key):
+        """Return (data, metadata) for a key, or None on a miss"""
+        path = self._path(key, DATA_SUFFIX)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        metadata = {}
+        try:
+            with open(self._path(key, META_SUFFIX), encoding="utf-8") as file:
+                metadata = json.load(file)
+        except (OSError, ValueError):
+            pass
+
+        # Touch the entry so it counts as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data, metadata
+
+    def _stored_size(self, key):
+        """Bytes an existing entry takes on disk, 0 if there is none"""
+        size = 0
+        for suffix in (DATA_SUFFIX, META_SUFFIX):
+            try:
+                size += os.path.getsize(self._path(key, suffix))
+            except OSError:
+                pass
+        return size
+
+    def put(self, key, data, metadata=None):
+        """Store encoded image bytes (and optional metadata) under a key"""
+        path = self._path(key, DATA_SUFFIX)
+        meta_path = self._path(key, META_SUFFIX)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # An overwritten entry no longer counts towards the total
+        old_size = self._stored_size(key)
+
+        size = len(data)
+        if metadata is not None:
+            meta = json.dumps(metadata).encode("utf-8")
+            write_atomic(meta_path, meta)
+            size += len(meta)
+        elif os.path.exists(meta_path):
+            # Metadata of the replaced entry would no longer match its image
+            os.remove(meta_path)
+        write_atomic(path, data)
+
+        self.writes += 1
+        self.total_bytes += size - old_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is under 90% of its limit"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _path, size, _mtime in entries)
+        target = self.max_bytes * 0.9
+
+        for path, size, _mtime in entries:
+            if total <= target:
+                break
+            for victim in (path, path[:-len(DATA_SUFFIX)] + META_SUFFIX):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+            self.evictions += 1
+
+        self.total_bytes = total
+
+    def clear(self):
+        for path, _size, _mtime in list(self._entries()):
+            for victim in (path, path[:-len(DATA_SUFFIX)] + META_SUFFIX):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+        self.total_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class MemoryRenderCache:
+    """Size-bounded LRU of encoded images kept in memory only"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return (data, metadata) for a key, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, data, metadata=None):
+        """Store encoded image bytes (and optional metadata) under a key"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= len(old[0])
+        self._entries[key] = (data, dict(metadata or {}))
+        self.total_bytes += len(data)
+        self.writes += 1
+
+        # Least recently used entries go first, but the newest one is always kept
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _key, (old_data, _metadata) = self._entries.popitem(last=False)
+            self.total_bytes -= len(old_data)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,104 @@
+"""Flower decorations for the floral wallpaper.
+
+Flowers are pre-rendered once per (size, color) as small RGBA sprites and
+placed from a FlowerLayout (see layout.py). The finished decoration layer
+can be kept as a reusable background, so a wallpaper only needs a copy of
+it before the QR code, banner and title are added.
+"""
+import math
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+
+CENTER_COLOR = (255, 215, 0, 230)  # Gold center
+
+
+def draw_flower(draw, x, y, size, color):
+    """Draw a simple flower using circles"""
+    # Draw petals
+    for angle in range(0, 360, 45):
+        rad = math.radians(angle)
+        offset = size // 2
+        px = x + int(offset * math.cos(rad))
+        py = y + int(offset * math.sin(rad))
+
+        # Draw petal
+        draw.ellipse((px - size//2, py - size//2, px + size//2, py + size//2), fill=color)
+
+    # Draw center
+    draw.ellipse((x - size//3, y - size//3, x + size//3, y + size//3), fill=CENTER_COLOR)
+
+
+@lru_cache(maxsize=256)
+def flower_sprite(size, color):
+    """Pre-render one flower centered on a transparent tile"""
+    # Petals reach at most `size` pixels from the flower center
+    sprite = Image.new("RGBA", (2 * size + 1, 2 * size + 1), (0, 0, 0, 0))
+    draw_flower(ImageDraw.Draw(sprite), size, size, size, color)
+    return sprite
+
+
+def paste_sprite(image, sprite, x, y):
+    """Alpha-composite a sprite centered on (x, y), clipping at the edges"""
+    half = sprite.width // 2
+    left, top = x - half, y - half
+    # alpha_composite rejects negative destinations, so crop the sprite instead
+    source = (max(0, -left), max(0, -top))
+    image.alpha_composite(sprite, dest=(max(0, left), max(0, top)), source=source)
+
+
+def render_decoration_layer(width, height, layout):
+    """Render the flowers of a FlowerLayout onto a transparent RGBA layer"""
+    layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    for x, y, size, color in layout.scaled(width, height):
+        paste_sprite(layer, flower_sprite(size, color), x, y)
+    return layer
+
+
+class DecorationCache:
+    """LRU cache of decorated wallpaper backgrounds"""
+
+    def __init__(self, max_layers=8):
+        self.max_layers = max_layers
+        self.hits = 0
+        self.misses = 0
+        self._backgrounds = OrderedDict()
+
+    def background(self, width, height, layout, background_color, keep=True):
+        """Return the shared background for a layout; callers must copy it before drawing
+
+        keep=False is for one-off layouts that won't be requested again.
+        """
+        key = (width, height, layout.key(), background_color)
+        background = self._backgrounds.get(key)
+        if background is not None:
+            self._backgrounds.move_to_end(key)
+            self.hits += 1
+            return background
+
+        self.misses += 1
+        background = Image.new("RGBA", (width, height), background_color)
+        background.alpha_composite(render_decoration_layer(width, height, layout))
+
+        if keep:
+            self._backgrounds[key] = background
+            while len(self._backgrounds) > self.max_layers:
+                self._backgrounds.popitem(last=False)
+        return background
+
+    def clear(self):
+        self._backgrounds.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "layers": len(self._backgrounds),
+            "sprites": flower_sprite.cache_info().currsize,
+        }
+
+
+# Process-wide cache shared by every floral renderer
+decoration_cache = DecorationCache()
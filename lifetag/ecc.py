@@ -0,0 +1,134 @@
+"""Adaptive error-correction level and version selection.
+
+The apps used fixed levels: L for the standard code and H for the floral
+wallpaper, even though the decorations never cover the QR code there. With
+error_correction="auto", the level and version are chosen per payload
+instead:
+
+1. Take the smallest version that holds the payload at the minimum
+   redundancy level. Smaller versions encode faster and give larger
+   modules, which scan faster.
+2. Use the strongest level that still fits that same version, since the
+   extra redundancy is free.
+3. If the modules would be smaller than the minimum pixel pitch at the
+   printed size, fall back to weaker levels until they are not.
+
+The choice and the reason for it are reported in the render metadata.
+"""
+import qrcode
+from qrcode import constants
+from qrcode.exceptions import DataOverflowError
+
+
+# Levels from the weakest to the strongest
+LEVEL_NAMES = ["L", "M", "Q", "H"]
+
+LEVELS = {
+    "L": constants.ERROR_CORRECT_L,
+    "M": constants.ERROR_CORRECT_M,
+    "Q": constants.ERROR_CORRECT_Q,
+    "H": constants.ERROR_CORRECT_H,
+}
+
+# Approximate share of damaged codewords each level recovers, in percent
+RECOVERY = {"L": 7, "M": 15, "Q": 25, "H": 30}
+
+
+def level_name(error_correction):
+    """Letter for a qrcode ERROR_CORRECT_* constant"""
+    for name, value in LEVELS.items():
+        if value == error_correction:
+            return name
+    raise ValueError(f"Unknown error correction level {error_correction!r}")
+
+
+def parse_level(value):
+    """Accept a level letter or a qrcode constant, returning the constant"""
+    if isinstance(value, str):
+        try:
+            return LEVELS[value.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown error correction level '{value}', expected one of: {', '.join(LEVELS)}")
+    level_name(value)
+    return value
+
+
+def fit_versions(payload):
+    """Smallest version holding the payload at each level, or None where it doesn't fit"""
+    qr = qrcode.QRCode()
+    qr.add_data(payload)
+    versions = {}
+    for name in LEVEL_NAMES:
+        qr.error_correction = LEVELS[name]
+        try:
+            versions[name] = qr.best_fit()
+        except (DataOverflowError, ValueError):
+            # best_fit overflows past version 40 as a ValueError from the version setter
+            versions[name] = None
+    return versions
+
+
+def payload_fits(payload, error_correction):
+    """True if the payload fits in a version 40 symbol at a level letter or constant"""
+    # No symbol holds more than 7089 characters (all digits, level L)
+    if len(payload) > 7089:
+        return False
+    qr = qrcode.QRCode(error_correction=parse_level(error_correction))
+    qr.add_data(payload)
+    try:
+        qr.best_fit()
+    except (DataOverflowError, ValueError):
+        return False
+    return True
+
+
+def modules_for(version):
+    return version * 4 + 17
+
+
+def choose_error_correction(payload, module_pitch, min_level="L", min_pitch=0):
+    """Pick the level and version for a payload
+
+    module_pitch(modules) gives the pixel size of one module for a symbol
+    with that many modules per side. Returns a dictionary describing the
+    choice, suitable for render metadata.
+    """
+    candidates = fit_versions(payload)
+    min_index = LEVEL_NAMES.index(min_level)
+    if not any(candidates.values()):
+        raise DataOverflowError()
+
+    def choice(name, reason):
+        version = candidates[name]
+        return {
+            "error_correction": name,
+            "version": version,
+            "modules": modules_for(version),
+            "module_pitch": round(module_pitch(modules_for(version)), 2),
+            "recovery_percent": RECOVERY[name],
+            "min_error_correction": min_level,
+            "min_module_pitch": min_pitch,
+            "candidates": candidates,
+            "reason": reason,
+        }
+
+    version = candidates[min_level]
+    if version is not None and module_pitch(modules_for(version)) >= min_pitch:
+        # The strongest level that costs no extra modules
+        strongest = max((name for name in LEVEL_NAMES[min_index:] if candidates[name] == version),
+                        key=LEVEL_NAMES.index)
+        if strongest == min_level:
+            reason = f"version {version} is the smallest that fits at {min_level}"
+        else:
+            reason = f"{strongest} fits the same version {version} as {min_level}, so the extra redundancy is free"
+        return choice(strongest, reason)
+
+    # Give up redundancy to keep the modules large enough to scan
+    problem = f"{min_level} can't hold the payload" if version is None else f"{min_level} needs modules below {min_pitch}px"
+    for name in reversed(LEVEL_NAMES[:min_index]):
+        fitted = candidates[name]
+        if fitted is not None and module_pitch(modules_for(fitted)) >= min_pitch:
+            return choice(name, f"{problem}; relaxed to {name}")
+
+    name = next(name for name in LEVEL_NAMES if candidates[name] is not None)
+    return choice(name, f"no level reaches {min_pitch}px modules; using {name} for the largest modules")
@@ -0,0 +1,70 @@
+"""Precomputed banner and text glow effects for the floral wallpaper.
+
+The banner's fading edges are built as one NumPy alpha column broadcast
+across the width, and the title glow is a single blurred shadow mask,
+instead of drawing rectangles row by row and the text once per glow step.
+Both only depend on the wallpaper size and the effect parameters, so they
+are computed once per size and cached.
+"""
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+
+def draw_text(image, xy, text, font, fill):
+    """Alpha-composite centered, anti-aliased text onto an RGBA image"""
+    # Drawing straight onto transparent pixels would darken the anti-aliased edges
+    mask = Image.new('L', image.size, 0)
+    ImageDraw.Draw(mask).text(xy, text, fill=fill[3], font=font, anchor="mm")
+    color = Image.new('RGBA', image.size, fill[:3] + (0,))
+    color.putalpha(mask)
+    image.alpha_composite(color)
+
+
+def edge_alpha(edge_height, max_alpha=150, falloff=1.0):
+    """Alpha of each edge row, starting next to the banner and fading out"""
+    distance = np.arange(edge_height) / edge_height
+    return (max_alpha * (1 - distance) ** falloff).astype(np.uint8)
+
+
+@lru_cache(maxsize=32)
+def banner_gradient(width, banner_height, edge_height, color=(255, 151, 187), banner_alpha=200,
+                    max_edge_alpha=150, falloff=1.0):
+    """Banner fill with fading top and bottom edges, as an RGBA image
+
+    Callers draw onto a copy, since the image is shared through the cache.
+    """
+    edge = edge_alpha(edge_height, max_edge_alpha, falloff)
+    column = np.concatenate([edge[::-1], np.full(banner_height, banner_alpha, np.uint8), edge])
+
+    pixels = np.empty((column.size, width, 4), np.uint8)
+    pixels[..., :3] = color
+    pixels[..., 3] = column[:, None]
+    return Image.fromarray(pixels)
+
+
+@lru_cache(maxsize=32)
+def glow_text(size, center, text, font, fill, glow, glow_color=(0, 0, 0), glow_alpha=120):
+    """Centered text over a soft drop-shadow glow, as a shared RGBA image
+
+    The shadow is drawn once, offset down and to the right by about half the
+    glow size, and blurred; this replaces stacking one copy of the text per
+    pixel of glow.
+    """
+    image = Image.new('RGBA', size, glow_color + (0,))
+    if glow:
+        shadow = Image.new('L', size, 0)
+        offset = (glow + 1) / 2
+        ImageDraw.Draw(shadow).text((center[0] + offset, center[1] + offset), text,
+                                    fill=glow_alpha, font=font, anchor="mm")
+        image.putalpha(shadow.filter(ImageFilter.GaussianBlur(glow / 2)))
+
+    draw_text(image, center, text, font, fill)
+    return image
+
+
+def clear():
+    """Drop every cached effect"""
+    banner_gradient.cache_clear()
+    glow_text.cache_clear()
@@ -0,0 +1,508 @@
+"""Headless LifeTag rendering engine.
+
+This module holds the QR and wallpaper pipeline used by the desktop apps
+(`QRGenerator.py` and `QRGenerator_floral.py`) without any dependency on
+tkinter, so the same code can run in batch jobs and services.
+"""
+import hashlib
+
+import qrcode
+from PIL import Image, ImageDraw
+
+from .decorations import decoration_cache, render_decoration_layer
+from .ecc import LEVELS, choose_error_correction, level_name, parse_level
+from .effects import banner_gradient, glow_text
+from .fonts import get_font
+from .instrument import stage
+from .layout import generate_layout, seeded_layout
+from .payload import encode_payload
+from .qrcache import qr_cache
+from .raster import rasterize_matrix
+
+
+# Form fields in the order the desktop apps show them
+FORM_FIELDS = [
+    "full_name", "dob", "blood_group", "allergies", "medical_conditions",
+    "medications", "emergency_contact_name", "emergency_contact_phone",
+    "emergency_contact_relation", "address", "additional_info",
+]
+
+# Fields that must be filled before a QR code is generated
+REQUIRED_FIELDS = ["full_name", "blood_group", "emergency_contact_name", "emergency_contact_phone"]
+
+
+def validate_record(data):
+    """Return a list of validation errors for a record (empty when valid)"""
+    errors = []
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            errors.append(f"Please fill in the {field.replace('_', ' ')} field.")
+    return errors
+
+
+# Nested sections of the QR payload and its top-level text fields
+QR_DATA_SECTIONS = ["personal_info", "medical_info", "emergency_contact"]
+QR_DATA_FIELDS = ["type", "address", "additional_info", "emergency_number"]
+
+
+def validate_qr_data(qr_data):
+    """Return a list of schema errors for a QR payload dictionary (empty when well formed)"""
+    if not isinstance(qr_data, dict):
+        return ["Expected a qr_data object"]
+    errors = []
+    for section in QR_DATA_SECTIONS:
+        values = qr_data.get(section, {})
+        if not isinstance(values, dict):
+            errors.append(f"{section} must be an object")
+            continue
+        errors.extend(f"{section}.{key} must be a string" for key, value in values.items()
+                      if not isinstance(value, str))
+    errors.extend(f"{key} must be a string" for key in QR_DATA_FIELDS
+                  if key in qr_data and not isinstance(qr_data[key], str))
+    return errors
+
+
+def build_qr_data(data, emergency_number=None):
+    """Build the QR payload dictionary from form data"""
+    qr_data = {
+        "type": "MEDICAL_EMERGENCY",
+        "personal_info": {
+            "name": data.get("full_name", ""),
+            "dob": data.get("dob", ""),
+            "blood_group": data.get("blood_group", "")
+        },
+        "medical_info": {
+            "allergies": data.get("allergies", ""),
+            "conditions": data.get("medical_conditions", ""),
+            "medications": data.get("medications", "")
+        },
+        "emergency_contact": {
+            "name": data.get("emergency_contact_name", ""),
+            "phone": data.get("emergency_contact_phone", ""),
+            "relationship": data.get("emergency_contact_relation", "")
+        },
+        "address": data.get("address", ""),
+        "additional_info": data.get("additional_info", "")
+    }
+
+    # Only the standard build embeds the configured emergency number
+    if emergency_number is not None:
+        qr_data["emergency_number"] = emergency_number
+
+    return qr_data
+
+
+def form_data_from_qr_data(qr_data):
+    """Flatten a QR payload dictionary back into form data"""
+    personal = qr_data.get("personal_info", {})
+    medical = qr_data.get("medical_info", {})
+    contact = qr_data.get("emergency_contact", {})
+    return {
+        "full_name": personal.get("name", ""),
+        "dob": personal.get("dob", ""),
+        "blood_group": personal.get("blood_group", ""),
+        "allergies": medical.get("allergies", ""),
+        "medical_conditions": medical.get("conditions", ""),
+        "medications": medical.get("medications", ""),
+        "emergency_contact_name": contact.get("name", ""),
+        "emergency_contact_phone": contact.get("phone", ""),
+        "emergency_contact_relation": contact.get("relationship", ""),
+        "address": qr_data.get("address", ""),
+        "additional_info": qr_data.get("additional_info", ""),
+    }
+
+
+def qr_metadata(qr, payload):
+    """Describe an encoded QR code and its payload"""
+    encoded = payload.encode("utf-8")
+    metadata = {
+        "version": qr.version,
+        "modules": qr.modules_count,
+        "error_correction": level_name(qr.error_correction),
+        "payload_bytes": len(encoded),
+        "payload_hash": hashlib.sha256(encoded).hexdigest(),
+    }
+    if qr.error_correction_choice:
+        metadata["error_correction_choice"] = qr.error_correction_choice
+    return metadata
+
+
+class RenderResult:
+    """A rendered LifeTag image together with the QR code it embeds"""
+
+    def __init__(self, image, qr_image, qr_data, qr, payload):
+        self.image = image
+        self.qr_image = qr_image
+        self.qr_data = qr_data
+        self.qr = qr
+        self.payload = payload
+
+    @property
+    def version(self):
+        return self.qr.version
+
+    @property
+    def modules_count(self):
+        return self.qr.modules_count
+
+    def metadata(self):
+        """Describe the encoded QR code"""
+        return qr_metadata(self.qr, self.payload)
+
+
+class StandardRenderer:
+    """Plain black-on-white QR code, as produced by the standard app"""
+
+    theme = "standard"
+    fill_color = "black"
+    back_color = "white"
+    error_correction = qrcode.constants.ERROR_CORRECT_L
+    box_size = 10
+    border = 4
+
+    # Targets for error_correction="auto" (see lifetag.ecc)
+    min_error_correction = "L"
+    min_module_pitch = 0
+
+    def __init__(self, emergency_number="911", payload_format="json", error_correction=None):
+        self.emergency_number = emergency_number
+        self.payload_format = payload_format
+        self.qr_cache = qr_cache
+        # None keeps the theme's level; "auto" picks one per payload
+        if error_correction == "auto":
+            self.error_correction = "auto"
+        elif error_correction is not None:
+            self.error_correction = parse_level(error_correction)
+
+    def build_qr_data(self, data):
+        """Build the QR payload for this theme"""
+        return build_qr_data(data, self.emergency_number)
+
+    def render_options(self):
+        """Options that change the rendered output, used for cache keys"""
+        options = {
+            "theme": self.theme,
+            "error_correction": self.error_correction,
+            "payload_format": self.payload_format,
+            "size": [self.box_size, self.border],
+        }
+        if self.error_correction == "auto":
+            options["error_correction_targets"] = [self.min_error_correction, self.min_module_pitch]
+        return options
+
+    def encode_payload(self, qr_data):
+        """Serialize the payload in the configured format"""
+        return encode_payload(qr_data, self.payload_format)
+
+    def make_qr(self, payload):
+        """Encode the payload text into a fitted QR code, as a QRMatrix"""
+        error_correction, version, choice = self.error_correction, None, None
+        if error_correction == "auto":
+            choice = choose_error_correction(payload, self.module_pitch, self.min_error_correction,
+                                             self.min_module_pitch)
+            error_correction, version = LEVELS[choice["error_correction"]], choice["version"]
+
+        with stage("qr_encode", theme=self.theme) as step:
+            # Encoded modules are shared across themes and sizes through the QR cache
+            qr = self.qr_cache.encode(payload, error_correction, version, self.border)
+            step.set(version=qr.version, modules=qr.modules_count, payload_bytes=len(payload.encode("utf-8")),
+                     error_correction=level_name(error_correction))
+        # Kept with the matrix so the render metadata can explain the choice
+        return qr.replace(error_correction_choice=choice) if choice else qr
+
+    def module_pitch(self, modules):
+        """Pixel size of one module for a QR code with this many modules per side"""
+        return self.box_size
+
+    def qr_pixel_size(self, qr):
+        """Pixel size of the QR image for this theme"""
+        return (qr.modules_count + 2 * self.border) * self.box_size
+
+    def qr_placement(self, qr):
+        """(left, top, size) of the QR image within the final image"""
+        return 0, 0, self.qr_pixel_size(qr)
+
+    def make_qr_image(self, qr):
+        """Draw the QR code with the theme colors"""
+        size = self.qr_pixel_size(qr)
+        with stage("rasterize", theme=self.theme, width=size, height=size, modules=qr.modules_count):
+            return rasterize_matrix(qr, size, self.fill_color, self.back_color, "RGB")
+
+    def compose(self, qr_image, data):
+        """Turn the QR image into the final output image"""
+        return qr_image
+
+    def render(self, data):
+        """Render form data into a RenderResult"""
+        with stage("render", theme=self.theme) as render_stage:
+            with stage("payload", theme=self.theme) as step:
+                qr_data = self.build_qr_data(data)
+                payload = self.encode_payload(qr_data)
+                step.set(payload_bytes=len(payload.encode("utf-8")))
+            qr = self.make_qr(payload)
+            qr_image = self.make_qr_image(qr)
+            with stage("compose", theme=self.theme) as step:
+                image = self.compose(qr_image, data)
+                step.set(width=image.width, height=image.height)
+            result = RenderResult(image, qr_image, qr_data, qr, payload)
+            render_stage.set(width=image.width, height=image.height, **result.metadata())
+        return result
+
+
+class FloralRenderer(StandardRenderer):
+    """Flower-themed phone wallpaper with an embedded QR code
+
+    The layout is designed at 1080x1920. Other sizes, such as small
+    previews, draw every element directly at the target resolution with
+    the same proportions instead of downsampling a full-size render. For
+    other aspect ratios, vertical positions follow the wallpaper height and
+    sizes are scaled so every element still fits both dimensions.
+    """
+
+    theme = "floral"
+    fill_color = "#060364"
+    back_color = "#F9F5E7"
+    # Higher error correction for better design flexibility
+    error_correction = qrcode.constants.ERROR_CORRECT_H
+
+    # Standard phone wallpaper size, which the layout geometry is designed for
+    width = 1080
+    height = 1920
+    reference_width = 1080
+    reference_height = 1920
+
+    # Resolution-independent layout: *_y are fractions of the wallpaper height,
+    # everything else is in pixels of the reference design and scaled by px()
+    layout = {
+        "title_y": 0.1,
+        "title_font": 42,
+        "title_glow": 3,
+        "qr_y": 0.25,
+        "qr_size": 540,
+        "banner_y": 0.5,
+        "banner_height": 120,
+        "banner_edge": 20,
+        "banner_label_y": 20,
+        "banner_label_font": 36,
+        "banner_phone_y": 70,
+        "banner_phone_font": 48,
+    }
+
+    background_color = (249, 245, 231, 255)  # Soft cream background
+    title_text = "MEDICAL EMERGENCY INFO"
+
+    # The decorations never cover the QR code, so automatic selection doesn't need H
+    min_error_correction = "M"
+    min_module_pitch = 4
+
+    def __init__(self, emergency_number=None, decoration_seed=0, cache_background=True, payload_format="json",
+                 width=None, height=None, error_correction=None, decoration_layout=None):
+        super().__init__(emergency_number, payload_format, error_correction)
+        self.width = width or self.width
+        self.height = height or self.height
+        self.scale = min(self.width / self.reference_width, self.height / self.reference_height)
+        # A fixed seed gives a reproducible, cacheable flower layout; None picks a new one each time
+        self.decoration_seed = decoration_seed
+        # A precomputed FlowerLayout replaces the seeded one
+        self.decoration_layout = decoration_layout
+        self.cache_background = cache_background
+        self.decorations = decoration_cache
+        self._reference_zones = None
+
+    @classmethod
+    def for_width(cls, width, **kwargs):
+        """Renderer for a wallpaper of the given width in the standard aspect ratio"""
+        return cls(width=width, height=round(width * cls.height / cls.width), **kwargs)
+
+    def px(self, value):
+        """Scale a length from the 1080px design to this wallpaper"""
+        return max(1, round(value * self.scale))
+
+    def y(self, name):
+        """Vertical position of a layout element on this wallpaper"""
+        return int(self.height * self.layout[name])
+
+    @property
+    def reproducible(self):
+        """False when every render gets a new random flower layout"""
+        return self.decoration_layout is not None or self.decoration_seed is not None
+
+    def render_options(self):
+        # A random flower layout can't be reproduced, so it can't be cached
+        if not self.reproducible:
+            return None
+        options = super().render_options()
+        options["size"] = [self.width, self.height]
+        options["decoration_layout"] = self.flower_layout().key()
+        return options
+
+    def exclusion_zones(self):
+        """(name, (left, top, right, bottom)) of the areas flowers must keep clear of"""
+        left, top, size = self.qr_placement()
+        banner_y = self.y("banner_y")
+        edge = self.px(self.layout["banner_edge"])
+
+        font = get_font("Georgia", self.px(self.layout["title_font"]))
+        text_left, text_top, text_right, text_bottom = font.getbbox(self.title_text, anchor="mm")
+        glow = 2 * self.px(self.layout["title_glow"])
+        title_y = self.y("title_y")
+        center = self.width // 2
+
+        return [
+            # The QR image includes its quiet zone
+            ("qr", (left, top, left + size, top + size)),
+            ("banner", (0, banner_y - edge, self.width, banner_y + self.px(self.layout["banner_height"]) + edge)),
+            ("title", (center + text_left - glow, title_y + text_top - glow,
+                       center + text_right + glow, title_y + text_bottom + glow)),
+        ]
+
+    def reference_zones(self):
+        """Exclusion zones of this design on the reference canvas that layouts are generated for
+
+        Elements scale by the smaller of the two axis scales, so these zones
+        cover the scaled zones of every other wallpaper size.
+        """
+        if self._reference_zones is None:
+            reference = type(self)(width=self.reference_width, height=self.reference_height, decoration_seed=None)
+            self._reference_zones = tuple(reference.exclusion_zones())
+        return self._reference_zones
+
+    def flower_layout(self):
+        """The FlowerLayout for the next render"""
+        if self.decoration_layout is not None:
+            return self.decoration_layout
+        if self.decoration_seed is None:
+            return generate_layout(None, self.reference_zones())
+        return seeded_layout(self.decoration_seed, self.reference_zones())
+
+    def qr_pixel_size(self, qr=None):
+        # Drawn straight at its size on the wallpaper (half the width on phones)
+        return self.px(self.layout["qr_size"])
+
+    def module_pitch(self, modules):
+        return self.qr_pixel_size() / (modules + 2 * self.border)
+
+    def qr_placement(self, qr=None):
+        size = self.qr_pixel_size(qr)
+        return (self.width - size) // 2, self.y("qr_y") - size // 2, size
+
+    def make_qr_image(self, qr):
+        size = self.qr_pixel_size(qr)
+        with stage("rasterize", theme=self.theme, width=size, height=size, modules=qr.modules_count):
+            return rasterize_matrix(qr, size, self.fill_color, self.back_color)
+
+    def compose(self, qr_image, data):
+        return self.apply_flower_theme(qr_image, data.get("emergency_contact_phone", ""))
+
+    def apply_flower_theme(self, qr_image, phone_number):
+        """Apply flower theme to the QR code and add emergency phone number"""
+        return self.compose_layers([
+            self.qr_layer(qr_image),
+            # Emergency contact information in a decorative banner
+            self.banner_layer(phone_number),
+            # Medical emergency text
+            self.title_layer(),
+        ])
+
+    def compose_layers(self, layers):
+        """Composite (patch, position) layers over the decorated background"""
+        # Start from the decorated background (16:9 ratio for phones)
+        with stage("background", theme=self.theme, width=self.width, height=self.height):
+            wallpaper = self.make_background(self.width, self.height)
+        with stage("composite", theme=self.theme, width=self.width, height=self.height):
+            for patch, position in layers:
+                wallpaper.alpha_composite(patch, dest=position)
+        return wallpaper
+
+    def make_background(self, width, height):
+        """Return a fresh wallpaper canvas with the flower decorations"""
+        layout = self.flower_layout()
+        if self.cache_background:
+            return self.decorations.background(width, height, layout, self.background_color,
+                                               keep=self.reproducible).copy()
+
+        wallpaper = Image.new('RGBA', (width, height), self.background_color)
+        wallpaper.alpha_composite(render_decoration_layer(width, height, layout))
+        return wallpaper
+
+    def qr_layer(self, qr_image):
+        """Place the QR code in the center of the upper third"""
+        if qr_image.mode != 'RGBA':
+            qr_image = qr_image.convert('RGBA')
+
+        # QR code size is half of the wallpaper width on phones
+        left, top, qr_size = self.qr_placement()
+        if qr_image.size != (qr_size, qr_size):
+            qr_image = qr_image.resize((qr_size, qr_size), Image.LANCZOS)
+
+        return qr_image, (left, top)
+
+    def banner_layer(self, phone_number):
+        """Emergency contact banner below the QR code, as a transparent patch"""
+        with stage("banner", theme=self.theme, width=self.width, height=self.height):
+            return self._banner_layer(phone_number)
+
+    def _banner_layer(self, phone_number):
+        width = self.width
+        banner_y = self.y("banner_y")
+        banner_height = self.px(self.layout["banner_height"])
+        edge_height = self.px(self.layout["banner_edge"])
+
+        # The patch spans the banner and its fading edges
+        top = banner_y - edge_height
+        y = banner_y - top
+
+        # Semi-transparent pink banner with decorative fading edges, cached per size
+        patch = banner_gradient(width, banner_height, edge_height).copy()
+        draw = ImageDraw.Draw(patch)
+
+        # Add emergency text
+        font_large = get_font("Georgia", self.px(self.layout["banner_phone_font"]))
+        font_small = get_font("Georgia", self.px(self.layout["banner_label_font"]))
+
+        # Add "EMERGENCY CONTACT" text
+        text = "EMERGENCY CONTACT"
+        draw.text((width//2, y + self.px(self.layout["banner_label_y"])), text, fill=(255, 255, 255), font=font_small, anchor="mm")
+
+        # Add phone number in larger, bold font
+        draw.text((width//2, y + self.px(self.layout["banner_phone_y"])), phone_number, fill=(255, 255, 255), font=font_large, anchor="mm")
+
+        return patch, (0, top)
+
+    def title_layer(self):
+        """Medical emergency title at the top of the wallpaper, as a transparent patch"""
+        with stage("title", theme=self.theme, width=self.width, height=self.height):
+            return self._title_layer()
+
+    def _title_layer(self):
+        width = self.width
+        font = get_font("Georgia", self.px(self.layout["title_font"]))
+        text = self.title_text
+
+        # Position text at the top; the patch covers the text and its blurred glow
+        y_position = self.y("title_y")
+        glow = self.px(self.layout["title_glow"])
+        _left, text_top, _right, text_bottom = font.getbbox(text, anchor="mm")
+        top = y_position + text_top - 2 * glow
+        size = (width, text_bottom - text_top + 4 * glow + 1)
+        center = (width // 2, y_position - top)
+
+        # Main text over a slight glow effect, drawn once per size
+        patch = glow_text(size, center, text, font, (136, 176, 75, 255), glow)
+
+        return patch, (0, top)
+
+
+RENDERERS = {
+    "standard": StandardRenderer,
+    "floral": FloralRenderer,
+}
+
+
+def get_renderer(theme, **kwargs):
+    """Create the renderer registered for a theme name"""
+    try:
+        renderer_class = RENDERERS[theme]
+    except KeyError:
+        raise ValueError(f"Unknown theme '{theme}', expected one of: {', '.join(RENDERERS)}")
+    return renderer_class(**kwargs)
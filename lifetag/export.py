@@ -0,0 +1,161 @@
+"""Image encoders and presets for saved QR codes and wallpapers.
+
+Rendered images come out as RGB or RGBA canvases, and saving them with
+Pillow's defaults stores far more than they hold: the standard QR code
+uses two colors, and the floral wallpaper is fully opaque. Every preset
+therefore drops an opaque alpha channel straight to RGB (pasting onto a
+background only where there is real transparency), and the PNG presets
+store images with few colors as an exact palette at the smallest bit
+depth, which is lossless and about a third of the size for the standard
+code.
+
+Presets:
+
+    png         palette or RGB PNG, zlib level 6
+    png-fast    zlib level 1, for when encoding time matters more than bytes
+    png-small   optimize=True, the smallest PNG Pillow writes
+    jpg         quality 90 with optimized Huffman tables
+    webp        lossless WebP at low effort (method 1, quality 0); about
+                half the size of PNG and quicker to encode
+    webp-small  lossless WebP, thorough search (method 6, quality 50);
+                about a fifth smaller again, at twice the encoding time
+
+Every encode reports its time and output size, and emits an "encode"
+stage event.
+"""
+import os
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .instrument import stage
+
+
+PRESETS = {
+    "png": {"format": "PNG", "extension": "png", "palette": True, "options": {"compress_level": 6}},
+    "png-fast": {"format": "PNG", "extension": "png", "palette": True, "options": {"compress_level": 1}},
+    "png-small": {"format": "PNG", "extension": "png", "palette": True, "options": {"optimize": True}},
+    "jpg": {"format": "JPEG", "extension": "jpg", "palette": False,
+            "options": {"quality": 90, "optimize": True}},
+    "webp": {"format": "WEBP", "extension": "webp", "palette": False,
+             "options": {"lossless": True, "quality": 0, "method": 1}},
+    "webp-small": {"format": "WEBP", "extension": "webp", "palette": False,
+                   "options": {"lossless": True, "quality": 50, "method": 6}},
+}
+
+# File extensions that don't match a preset name
+ALIASES = {"jpeg": "jpg"}
+
+
+def parse_preset(name):
+    """Normalize a preset name or file extension"""
+    name = name.lower().lstrip(".")
+    name = ALIASES.get(name, name)
+    if name not in PRESETS:
+        raise ValueError(f"Unknown image format '{name}', expected one of: {', '.join(PRESETS)}")
+    return name
+
+
+def preset_for_path(path, default="png"):
+    """Preset matching a file name's extension, or default when it has none we know"""
+    extension = os.path.splitext(path)[1]
+    try:
+        return parse_preset(extension) if extension else default
+    except ValueError:
+        return default
+
+
+def extension(preset):
+    return PRESETS[parse_preset(preset)]["extension"]
+
+
+def flatten(image, background=(255, 255, 255)):
+    """Drop the alpha channel, compositing onto background only if something is transparent"""
+    if image.mode in ("LA", "P", "PA"):
+        image = image.convert("RGBA")
+    if image.mode != "RGBA":
+        return image
+
+    alpha = image.getchannel("A")
+    if alpha.getextrema()[0] == 255:
+        return image.convert("RGB")
+    flat = Image.new("RGB", image.size, background)
+    flat.paste(image, mask=alpha)
+    return flat
+
+
+def to_palette(image, max_colors=16):
+    """Exact palette version of an RGB image with at most max_colors colors, or None
+
+    Nothing is quantized: each pixel keeps its color, so the PNG is still
+    lossless. Returns (image, bits per pixel).
+    """
+    if image.mode != "RGB":
+        return None
+    colors = image.getcolors(max_colors)
+    if colors is None:
+        return None
+
+    # Look colors up as packed 24-bit values, one comparison per palette entry
+    pixels = np.asarray(image).astype(np.uint32)
+    packed = (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+    indexes = np.zeros(packed.shape, np.uint8)
+    palette = []
+    for index, (_count, color) in enumerate(colors):
+        if index:
+            indexes[packed == (color[0] << 16 | color[1] << 8 | color[2])] = index
+        palette.extend(color)
+
+    paletted = Image.fromarray(indexes, "P")
+    paletted.putpalette(palette)
+    bits = next(bits for bits in (1, 2, 4, 8) if len(colors) <= 1 << bits)
+    return paletted, bits
+
+
+class EncodedImage:
+    """Encoded image bytes, with the preset used and how long encoding took"""
+
+    def __init__(self, data, preset, seconds):
+        self.data = data
+        self.preset = preset
+        self.seconds = seconds
+
+    @property
+    def extension(self):
+        return PRESETS[self.preset]["extension"]
+
+    def __len__(self):
+        return len(self.data)
+
+    def as_dict(self):
+        return {"preset": self.preset, "bytes": len(self.data), "encode_ms": round(self.seconds * 1000, 2)}
+
+
+def encode(image, preset="png"):
+    """Encode an image with a preset, returning an EncodedImage"""
+    preset = parse_preset(preset)
+    settings = PRESETS[preset]
+    options = dict(settings["options"])
+    buffer = BytesIO()
+
+    with stage("encode", format=preset, width=image.width, height=image.height) as step:
+        start = time.perf_counter()
+        image = flatten(image)
+        if settings["palette"]:
+            paletted = to_palette(image)
+            if paletted:
+                image, options["bits"] = paletted
+        image.save(buffer, format=settings["format"], **options)
+        seconds = time.perf_counter() - start
+        step.set(bytes=buffer.tell())
+    return EncodedImage(buffer.getvalue(), preset, seconds)
+
+
+def save(image, path, preset=None):
+    """Encode an image with a preset (by default from the file extension) and write it to path"""
+    encoded = encode(image, preset or preset_for_path(path))
+    with open(path, "wb") as file:
+        file.write(encoded.data)
+    return encoded
@@ -0,0 +1,33 @@
+"""Atomic file writes.
+
+Caches, settings and metrics files are read by other processes, or by
+the next run after a crash, so none of them may ever be seen half
+written. Data goes to a temporary file in the target's directory and is
+renamed over the target, which replaces it in one step on every platform
+Python supports.
+"""
+import os
+import tempfile
+
+
+def write_atomic(path, data, sync=False):
+    """Replace a file's contents through a temporary file in the same directory
+
+    data may be bytes or text, which is written as UTF-8. With sync, the
+    data is flushed to disk before the rename, for files that must survive
+    a power loss. The temporary file is removed if anything fails.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,160 @@
+"""Font lookup for the wallpaper renderers.
+
+ImageFont.truetype("Georgia", ...) only works where the OS font loader
+happens to know that name, and fails on most Linux machines. The registry
+here resolves a family to a font file from a search path once, and keeps
+loaded FreeTypeFont objects per (family, size) for the whole process.
+
+Extra font directories can be added with the LIFETAG_FONT_PATH environment
+variable (separated like PATH). Fonts dropped into lifetag/fonts are
+searched first.
+"""
+import os
+import sys
+
+from PIL import ImageFont
+
+from .instrument import stage
+
+
+# Font files tried for each family, most preferred first. Metric-compatible
+# open fonts stand in when the named family isn't installed.
+FONT_FILES = {
+    "Georgia": [
+        "georgia.ttf", "gelasio-regular.ttf", "dejavuserif.ttf",
+        "liberationserif-regular.ttf", "notoserif-regular.ttf",
+    ],
+    "Arial": [
+        "arial.ttf", "liberationsans-regular.ttf", "dejavusans.ttf",
+        "notosans-regular.ttf",
+    ],
+}
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+BUNDLED_FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+
+
+def default_search_path():
+    """Return the directories searched for font files"""
+    paths = [BUNDLED_FONT_DIR]
+    paths.extend(p for p in os.environ.get("LIFETAG_FONT_PATH", "").split(os.pathsep) if p)
+
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        paths.append(os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"))
+        paths.append(os.path.join(os.environ.get("LOCALAPPDATA", home), "Microsoft", "Windows", "Fonts"))
+    elif sys.platform == "darwin":
+        paths.extend(["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")])
+    else:
+        paths.extend([
+            "/usr/share/fonts", "/usr/local/share/fonts",
+            os.path.join(home, ".local", "share", "fonts"), os.path.join(home, ".fonts"),
+        ])
+    return paths
+
+
+def load_default_font(size):
+    """Pillow's built-in font, scaled where the Pillow version allows it"""
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+class FontRegistry:
+    """Resolve font families from a search path and memoize loaded fonts"""
+
+    def __init__(self, search_path=None):
+        self.search_path = list(search_path) if search_path is not None else default_search_path()
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._paths = {}
+        self._fonts = {}
+
+    def _build_index(self):
+        """Map lower-case font file names to paths, walking the search path once"""
+        index = {}
+        for directory in self.search_path:
+            for dirpath, _dirnames, filenames in os.walk(directory):
+                for filename in filenames:
+                    if filename.lower().endswith(FONT_EXTENSIONS):
+                        # Earlier directories in the search path win
+                        index.setdefault(filename.lower(), os.path.join(dirpath, filename))
+        return index
+
+    def resolve(self, family):
+        """Return the font file used for a family, or None if nothing matches"""
+        if family in self._paths:
+            return self._paths[family]
+
+        if self._index is None:
+            self._index = self._build_index()
+
+        path = None
+        # A family may also be given directly as a file name or path
+        if os.path.isfile(family):
+            path = family
+        else:
+            for filename in FONT_FILES.get(family, []) + [family.lower() + ".ttf"]:
+                path = self._index.get(filename)
+                if path:
+                    break
+
+        self._paths[family] = path
+        return path
+
+    def get(self, family, size):
+        """Return a font for (family, size), loading it on first use"""
+        key = (family, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+
+        self.misses += 1
+        with stage("font_load", family=family, size=size) as step:
+            path = self.resolve(family)
+            font = None
+            if path:
+                try:
+                    font = ImageFont.truetype(path, size)
+                except OSError:
+                    font = None
+            if font is None:
+                font = load_default_font(size)
+                path = None
+            # A fallback font usually means the configured font files are missing
+            step.set(path=path, fallback=path is None)
+
+        self._fonts[key] = font
+        return font
+
+    def add_directory(self, directory):
+        """Search an extra directory first and forget earlier lookups"""
+        self.search_path.insert(0, directory)
+        self.clear()
+
+    def clear(self):
+        self._index = None
+        self._paths.clear()
+        self._fonts.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fonts": len(self._fonts),
+            "resolved": {family: path for family, path in self._paths.items()},
+        }
+
+
+# Process-wide registry used by the renderers
+font_registry = FontRegistry()
+
+
+def get_font(family, size):
+    """Return a memoized font from the process-wide registry"""
+    return font_registry.get(family, size)
@@ -0,0 +1,158 @@
+"""Streaming record ingestion for mass issuance.
+
+Records are read lazily from CSV, JSONL or stdin, one at a time, so memory
+use does not depend on the size of the input. Column names are mapped onto
+the form fields the desktop apps use, rows are checked with the same rules
+as the form, and invalid rows are written to a reject file together with
+the reasons instead of stopping the run.
+"""
+import csv
+import io
+import json
+import re
+import sys
+
+from .engine import FORM_FIELDS, form_data_from_qr_data, validate_record
+
+
+# Alternative column names found in HR exports, after normalization
+COLUMN_ALIASES = {
+    "name": "full_name",
+    "fullname": "full_name",
+    "employee_name": "full_name",
+    "date_of_birth": "dob",
+    "birth_date": "dob",
+    "birthdate": "dob",
+    "blood_type": "blood_group",
+    "bloodgroup": "blood_group",
+    "allergy": "allergies",
+    "conditions": "medical_conditions",
+    "medical_condition": "medical_conditions",
+    "medication": "medications",
+    "current_medications": "medications",
+    "emergency_contact": "emergency_contact_name",
+    "contact_name": "emergency_contact_name",
+    "emergency_phone": "emergency_contact_phone",
+    "contact_phone": "emergency_contact_phone",
+    "emergency_contact_relationship": "emergency_contact_relation",
+    "contact_relationship": "emergency_contact_relation",
+    "relationship": "emergency_contact_relation",
+    "relation": "emergency_contact_relation",
+    "home_address": "address",
+    "additional_information": "additional_info",
+    "notes": "additional_info",
+    "employee_id": "id",
+    "person_id": "id",
+}
+
+# Fields kept from an input row besides the form fields
+EXTRA_FIELDS = ["id", "profile"]
+
+
+def normalize_column(name):
+    """Reduce a column header to lower_snake_case"""
+    return re.sub(r"[^a-z0-9]+", "_", name.strip().lower()).strip("_")
+
+
+def map_columns(row):
+    """Map an input row onto form field names, dropping unknown columns"""
+    data = {}
+    for column, value in row.items():
+        if column is None:
+            continue
+        key = normalize_column(column)
+        key = COLUMN_ALIASES.get(key, key)
+        if key in FORM_FIELDS or key in EXTRA_FIELDS:
+            data[key] = "" if value is None else str(value).strip()
+    return data
+
+
+def detect_format(source):
+    """Guess the input format from a file name"""
+    if source != "-" and source.lower().endswith(".csv"):
+        return "csv"
+    return "jsonl"
+
+
+def iter_rows(file, input_format):
+    """Yield (line number, raw row) from an open text file"""
+    if input_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        # Accept records already in the QR payload schema
+        if isinstance(row, dict) and "personal_info" in row:
+            row = dict(form_data_from_qr_data(row), id=row.get("id", ""), profile=row.get("profile", ""))
+        yield line_number, row
+
+
+def iter_records(source, input_format=None):
+    """Yield (line number, form data or error) from a file path, or "-" for stdin"""
+    input_format = input_format or detect_format(source)
+    if source == "-":
+        file = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        yield from _iter_mapped(file, input_format)
+        return
+
+    with open(source, newline="", encoding="utf-8") as file:
+        yield from _iter_mapped(file, input_format)
+
+
+def _iter_mapped(file, input_format):
+    for line_number, row in iter_rows(file, input_format):
+        if isinstance(row, Exception):
+            yield line_number, row
+        elif not isinstance(row, dict):
+            yield line_number, ValueError("Expected an object per line")
+        else:
+            yield line_number, map_columns(row)
+
+
+class RejectWriter:
+    """Write rejected rows and their reasons to a JSONL file"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8") if path else None
+
+    def reject(self, line_number, reasons, record=None):
+        self.count += 1
+        if self._file:
+            entry = {"line": line_number, "reasons": reasons, "record": record}
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def valid_records(records, rejects):
+    """Pass through (line number, form data) pairs of valid rows, sending everything else to the reject writer"""
+    for line_number, data in records:
+        if isinstance(data, Exception):
+            rejects.reject(line_number, [str(data)])
+            continue
+        errors = validate_record(data)
+        if errors:
+            rejects.reject(line_number, errors, data)
+            continue
+        yield line_number, data
@@ -0,0 +1,181 @@
+"""Per-stage timing events from the render pipeline.
+
+The renderers wrap each stage (payload, QR encoding, rasterizing, layers,
+compositing, font loading) in stage(). When a hook is registered, every
+stage emits an event dictionary when it finishes:
+
+    {"stage": "qr_encode", "theme": "floral", "seconds": 0.104,
+     "version": 22, "modules": 105, "payload_bytes": 424}
+
+Depending on the stage, events carry the QR version and module count, the
+payload size in bytes and the image width and height. With no hook
+registered, stage() returns a shared no-op object, so instrumentation costs
+one list check per stage.
+
+Usage:
+    from lifetag import instrument
+    instrument.add_hook(instrument.JsonLinesExporter("events.jsonl"))
+"""
+import json
+import time
+
+from .fileio import write_atomic
+
+
+# Callables receiving every finished stage event
+_hooks = []
+
+
+def add_hook(hook):
+    """Register a callable receiving every stage event"""
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def has_hooks():
+    return bool(_hooks)
+
+
+def emit(event):
+    """Send an event to every registered hook"""
+    for hook in _hooks:
+        hook(event)
+
+
+class Stage:
+    """Times one pipeline stage and emits an event when it ends"""
+
+    __slots__ = ("event", "start")
+
+    def __init__(self, name, attributes):
+        self.event = {"stage": name}
+        self.event.update(attributes)
+
+    def set(self, **attributes):
+        """Attach attributes that are only known once the stage has run"""
+        self.event.update(attributes)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.event["seconds"] = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.event["error"] = exc_type.__name__
+        emit(self.event)
+
+
+class _NullStage:
+    """Stand-in used while no hook is registered"""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+def stage(name, **attributes):
+    """Context manager timing a stage; a no-op unless a hook is registered"""
+    if not _hooks:
+        return NULL_STAGE
+    return Stage(name, attributes)
+
+
+class JsonLinesExporter:
+    """Hook writing each event as one JSON line"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event):
+        self._file.write(json.dumps(dict(event, time=time.time())) + "\n")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PrometheusExporter:
+    """Hook aggregating events into Prometheus text exposition format
+
+    Write the result into a node_exporter textfile collector directory with
+    write(), or serve render() from an HTTP endpoint.
+    """
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, path=None):
+        self.path = path
+        self.stages = {}
+        self.versions = {}
+        self.payload_bytes = {}
+
+    def __call__(self, event):
+        key = (event["stage"], event.get("theme", ""))
+        counts = self.stages.get(key)
+        if counts is None:
+            counts = self.stages[key] = {"count": 0, "sum": 0.0, "buckets": [0] * len(self.BUCKETS)}
+        counts["count"] += 1
+        counts["sum"] += event["seconds"]
+        for i, bound in enumerate(self.BUCKETS):
+            if event["seconds"] <= bound:
+                counts["buckets"][i] += 1
+
+        # The QR version and payload size are recorded once per render
+        if event["stage"] == "render":
+            version_key = (event.get("theme", ""), event.get("version"))
+            self.versions[version_key] = self.versions.get(version_key, 0) + 1
+            theme = event.get("theme", "")
+            self.payload_bytes[theme] = self.payload_bytes.get(theme, 0) + event.get("payload_bytes", 0)
+
+    def render(self):
+        """Return the metrics as Prometheus text"""
+        lines = [
+            "# HELP lifetag_stage_seconds Time spent in each render stage.",
+            "# TYPE lifetag_stage_seconds histogram",
+        ]
+        for (name, theme), counts in sorted(self.stages.items()):
+            labels = f'stage="{name}",theme="{theme}"'
+            for bound, count in zip(self.BUCKETS, counts["buckets"]):
+                lines.append(f'lifetag_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'lifetag_stage_seconds_bucket{{{labels},le="+Inf"}} {counts["count"]}')
+            lines.append(f"lifetag_stage_seconds_sum{{{labels}}} {counts['sum']:.6f}")
+            lines.append(f"lifetag_stage_seconds_count{{{labels}}} {counts['count']}")
+
+        lines.append("# HELP lifetag_renders_total Rendered tags by QR version.")
+        lines.append("# TYPE lifetag_renders_total counter")
+        for (theme, version), count in sorted(self.versions.items(), key=str):
+            lines.append(f'lifetag_renders_total{{theme="{theme}",version="{version}"}} {count}')
+
+        lines.append("# HELP lifetag_payload_bytes_total Encoded payload bytes.")
+        lines.append("# TYPE lifetag_payload_bytes_total counter")
+        for theme, total in sorted(self.payload_bytes.items()):
+            lines.append(f'lifetag_payload_bytes_total{{theme="{theme}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=None):
+        """Atomically write the metrics file, so collectors never read a partial file"""
+        write_atomic(path or self.path, self.render())
@@ -0,0 +1,76 @@
+"""Incremental re-rendering of floral wallpapers.
+
+The wallpaper is split into layers that depend on different inputs:
+
+    qr      the encoded payload (any field stored in the QR code)
+    banner  the emergency contact phone number
+    title   nothing; drawn once
+
+The decorated background comes from the renderer's decoration cache. When
+the form changes, only layers whose inputs changed are redrawn; the rest
+are reused and everything is composited again, which is much cheaper than
+a full render.
+"""
+from .engine import FloralRenderer, qr_metadata
+
+
+# Bottom-to-top compositing order over the background
+LAYER_ORDER = ["qr", "banner", "title"]
+
+
+class LayeredWallpaper:
+    """A floral wallpaper kept as separately cached layers"""
+
+    def __init__(self, renderer=None):
+        self.renderer = renderer or FloralRenderer()
+        self.image = None
+        self.qr = None
+        self.payload = None
+        # Layers redrawn by the last update, for diagnostics
+        self.rendered = []
+        self._layers = {}
+
+    def layer_inputs(self, data):
+        """The value each layer depends on, for the given form data"""
+        payload = self.renderer.encode_payload(self.renderer.build_qr_data(data))
+        return {
+            "qr": payload,
+            "banner": data.get("emergency_contact_phone", ""),
+            "title": None,
+        }
+
+    def render_layer(self, name, inputs):
+        """Draw one layer, returning (patch, position)"""
+        if name == "qr":
+            self.payload = inputs
+            self.qr = self.renderer.make_qr(inputs)
+            return self.renderer.qr_layer(self.renderer.make_qr_image(self.qr))
+        if name == "banner":
+            return self.renderer.banner_layer(inputs)
+        if name == "title":
+            return self.renderer.title_layer()
+        raise ValueError(f"Unknown layer '{name}'")
+
+    def update(self, data):
+        """Bring the wallpaper up to date with the form data and return it"""
+        self.rendered = []
+        for name, inputs in self.layer_inputs(data).items():
+            layer = self._layers.get(name)
+            if layer is None or layer[0] != inputs:
+                self._layers[name] = (inputs, self.render_layer(name, inputs))
+                self.rendered.append(name)
+
+        if self.rendered or self.image is None:
+            self.image = self.renderer.compose_layers([self._layers[name][1] for name in LAYER_ORDER])
+        return self.image
+
+    def metadata(self):
+        """Describe the QR code in the current wallpaper"""
+        return qr_metadata(self.qr, self.payload)
+
+    def invalidate(self, name=None):
+        """Force one layer, or every layer, to be redrawn on the next update"""
+        if name is None:
+            self._layers.clear()
+        else:
+            self._layers.pop(name, None)
@@ -0,0 +1,229 @@
+"""Seeded flower layouts that keep clear of the QR code, banner and title.
+
+Flowers used to be scattered with no knowledge of the rest of the
+wallpaper, so they could land on the banner, the title or the QR code's
+quiet zone. A layout is now generated from a seed and a list of exclusion
+zones, rectangles in reference canvas pixels, and every candidate flower
+is rejected if it would touch a zone or another flower. Flowers are kept
+in a uniform grid whose cells are as wide as the largest flower, so an
+overlap test only looks at the 3x3 cells around the candidate, however
+many flowers are already placed.
+
+The same seed and zones always give the same layout. Layouts are plain
+data: they pickle for worker processes and save to JSON, so a layout can
+be generated once, reviewed, and reused by every batch run.
+
+Usage:
+    python -m lifetag.layout --seed 7 -o layout.json
+    python -m lifetag.batch employees.csv --layout layout.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+from functools import lru_cache
+
+
+# Canvas size layouts are generated for; other sizes are scaled from it
+REFERENCE_SIZE = (1080, 1920)
+
+FLOWER_COLORS = [
+    (255, 182, 193, 200),  # Light pink
+    (255, 151, 187, 200),  # Pink
+    (221, 160, 221, 200),  # Plum
+    (255, 192, 203, 200),  # Pink
+    (255, 228, 225, 200),  # Misty rose
+]
+
+# Ring of larger flowers around the QR code, then small flowers in the lower half
+RING_FLOWERS = 12
+RING_SIZES = (30, 60)
+SCATTERED_FLOWERS = 20
+SCATTERED_SIZES = (15, 30)
+
+# Candidate positions tried for each flower before it is left out
+MAX_ATTEMPTS = 40
+
+# Clear space kept around zones and between flowers, in reference pixels
+GAP = 4
+
+
+def circle_touches_rect(x, y, radius, rect):
+    """True if a circle overlaps a (left, top, right, bottom) rectangle"""
+    left, top, right, bottom = rect
+    dx = max(left - x, 0, x - right)
+    dy = max(top - y, 0, y - bottom)
+    return dx * dx + dy * dy < radius * radius
+
+
+class SpatialGrid:
+    """Uniform grid of placed circles for constant-time overlap tests"""
+
+    def __init__(self, max_radius, gap=0):
+        # Any circle that can touch a candidate has its center within one cell of it
+        self.cell_size = 2 * max_radius + gap
+        self.gap = gap
+        self._cells = {}
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def add(self, x, y, radius):
+        self._cells.setdefault(self._cell(x, y), []).append((x, y, radius))
+
+    def overlaps(self, x, y, radius):
+        cell_x, cell_y = self._cell(x, y)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other_x, other_y, other_radius in self._cells.get((cell_x + dx, cell_y + dy), ()):
+                    reach = radius + other_radius + self.gap
+                    if (x - other_x) ** 2 + (y - other_y) ** 2 < reach * reach:
+                        return True
+        return False
+
+
+class FlowerLayout:
+    """Positions, sizes and colors of the flowers on the reference canvas
+
+    A flower of a given size reaches size pixels from its center, so size
+    doubles as its radius.
+    """
+
+    def __init__(self, flowers, seed=None, zones=(), size=REFERENCE_SIZE):
+        self.flowers = [(x, y, size_, tuple(color)) for x, y, size_, color in flowers]
+        self.seed = seed
+        self.zones = tuple((name, tuple(rect)) for name, rect in zones)
+        self.size = tuple(size)
+
+    def scaled(self, width, height):
+        """(x, y, size, color) of every flower on a width x height canvas
+
+        Positions follow both dimensions; sizes use the smaller scale, like
+        the rest of the floral design, so flowers never grow towards the
+        zones on other aspect ratios.
+        """
+        scale_x, scale_y = width / self.size[0], height / self.size[1]
+        scale = min(scale_x, scale_y)
+        return [(round(x * scale_x), round(y * scale_y), max(1, round(size * scale)), color)
+                for x, y, size, color in self.flowers]
+
+    def key(self):
+        """Content hash, for cache keys"""
+        return hashlib.sha256(self.to_json().encode("utf-8")).hexdigest()[:16]
+
+    def as_dict(self):
+        return {
+            "size": list(self.size),
+            "seed": self.seed,
+            "zones": [{"name": name, "rect": list(rect)} for name, rect in self.zones],
+            "flowers": [[x, y, size, list(color)] for x, y, size, color in self.flowers],
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, data):
+        zones = [(zone["name"], zone["rect"]) for zone in data.get("zones", ())]
+        return cls(data["flowers"], data.get("seed"), zones, data.get("size", REFERENCE_SIZE))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.as_dict(), file, indent=1)
+
+    def __eq__(self, other):
+        if not isinstance(other, FlowerLayout):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __hash__(self):
+        return hash(self.to_json())
+
+    def __repr__(self):
+        return f"FlowerLayout(seed={self.seed}, flowers={len(self.flowers)}, zones={len(self.zones)})"
+
+
+def generate_layout(seed=None, zones=(), size=REFERENCE_SIZE):
+    """Place the flowers for a seed around the exclusion zones"""
+    width, height = size
+    rng = random.Random(seed)
+    grid = SpatialGrid(max(RING_SIZES[1], SCATTERED_SIZES[1]), GAP)
+    rects = [rect for _name, rect in zones]
+    flowers = []
+
+    def fits(x, y, radius):
+        if x < 0 or x > width or y < 0 or y > height:
+            return False
+        if any(circle_touches_rect(x, y, radius + GAP, rect) for rect in rects):
+            return False
+        return not grid.overlaps(x, y, radius)
+
+    def place(x, y, size_, color):
+        grid.add(x, y, size_)
+        flowers.append((x, y, size_, color))
+
+    # Flowers in a circular arrangement around the QR code, pushed outwards past its quiet zone
+    qr = dict(zones).get("qr")
+    if qr:
+        center_x, center_y = (qr[0] + qr[2]) // 2, (qr[1] + qr[3]) // 2
+    else:
+        center_x, center_y = width // 2, height // 4
+    radius = min(width, height) // 3
+    for i in range(RING_FLOWERS):
+        angle = math.radians(i * 360 / RING_FLOWERS)
+        size_ = rng.randint(*RING_SIZES)
+        color = rng.choice(FLOWER_COLORS)
+        for step in range(MAX_ATTEMPTS):
+            distance = radius + step * GAP * 2
+            x = center_x + int(distance * math.cos(angle))
+            y = center_y + int(distance * math.sin(angle))
+            if fits(x, y, size_):
+                place(x, y, size_, color)
+                break
+
+    # Some small flowers in the lower half
+    for i in range(SCATTERED_FLOWERS):
+        size_ = rng.randint(*SCATTERED_SIZES)
+        color = rng.choice(FLOWER_COLORS)
+        for attempt in range(MAX_ATTEMPTS):
+            x = rng.randint(0, width)
+            y = rng.randint(height // 2, height - 100)
+            if fits(x, y, size_):
+                place(x, y, size_, color)
+                break
+
+    return FlowerLayout(flowers, seed, zones, size)
+
+
+@lru_cache(maxsize=64)
+def seeded_layout(seed, zones=(), size=REFERENCE_SIZE):
+    """generate_layout for a fixed seed, computed once per process"""
+    return generate_layout(seed, zones, size)
+
+
+def main(argv=None):
+    from .engine import FloralRenderer
+
+    parser = argparse.ArgumentParser(description="Generate a floral decoration layout.")
+    parser.add_argument("--seed", type=int, default=0, help="layout seed")
+    parser.add_argument("-o", "--output", help="write the layout to this JSON file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    layout = generate_layout(args.seed, FloralRenderer().reference_zones())
+    if args.output:
+        layout.save(args.output)
+        print(json.dumps({"flowers": len(layout.flowers), "key": layout.key()}))
+    else:
+        print(json.dumps(layout.as_dict(), indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
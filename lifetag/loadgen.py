@@ -0,0 +1,130 @@
+"""Load generator for the LifeTag HTTP service.
+
+Usage:
+    python -m lifetag.loadgen http://127.0.0.1:8080/render?theme=floral -n 500 -c 16
+
+Sends synthetic qr_data records over keep-alive connections and prints the
+status codes, throughput and latency percentiles as JSON. --unique sets the
+share of distinct records, so request coalescing can be measured too.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from .engine import build_qr_data
+
+
+def synthetic_qr_data(index):
+    """A plausible qr_data record for request number index"""
+    return build_qr_data({
+        "full_name": f"Load Test {index}",
+        "dob": "1990-01-01",
+        "blood_group": "O+",
+        "allergies": "Penicillin",
+        "medical_conditions": "Asthma",
+        "medications": f"Inhaler, dose {index % 7}",
+        "emergency_contact_name": "Contact Person",
+        "emergency_contact_phone": f"+1 555 {index % 10000:04d}",
+        "emergency_contact_relation": "Friend",
+        "address": f"{index} Main Street",
+        "additional_info": "",
+    })
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(fraction * len(values) + 0.5) - 1))
+    return values[rank]
+
+
+async def send_request(reader, writer, host, path, body):
+    """Send one POST on an open connection and return the status code"""
+    head = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def run_load(url, requests=200, concurrency=8, unique=1.0, seed=0):
+    """Drive the service and return a summary dictionary"""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    rng = random.Random(seed)
+    distinct = max(1, int(requests * unique))
+    bodies = [json.dumps(synthetic_qr_data(rng.randrange(distinct))).encode("utf-8") for _ in range(requests)]
+
+    latencies = []
+    statuses = {}
+    queue = iter(bodies)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+        try:
+            for body in queue:
+                start = time.perf_counter()
+                try:
+                    status = await send_request(reader, writer, parts.netloc, path, body)
+                except (ConnectionError, asyncio.IncompleteReadError, IndexError, ValueError):
+                    status = "error"
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "distinct_records": distinct,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p90": round(percentile(latencies, 0.90) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure LifeTag service throughput and latency.")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:8080/render", help="render endpoint")
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="parallel connections")
+    parser.add_argument("--unique", type=float, default=1.0, help="share of distinct records (0-1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load(args.url, args.requests, args.concurrency, args.unique, args.seed))
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
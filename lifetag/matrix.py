@@ -0,0 +1,94 @@
+"""Compact QR module matrix.
+
+qrcode keeps modules as lists of lists of Python bools, about 8 bytes of
+pointer per module plus the list objects: roughly 250 KB for a version 40
+symbol. QRMatrix stores the same modules packed eight to a byte (under
+4 KB), goes straight to a NumPy array for rasterizing, and pickles as one
+small bytes object when passed to or from worker processes.
+"""
+import numpy as np
+
+
+class QRMatrix:
+    """Square QR module matrix packed to one bit per module
+
+    The quiet zone isn't stored; border records its width in modules and is
+    added back by to_array() and get_matrix().
+    """
+
+    __slots__ = ("bits", "size", "border", "version", "error_correction", "error_correction_choice")
+
+    def __init__(self, bits, size, border=4, version=None, error_correction=None, error_correction_choice=None):
+        self.bits = bytes(bits)
+        self.size = size
+        self.border = border
+        self.version = version if version is not None else (size - 17) // 4
+        self.error_correction = error_correction
+        # Explanation of an adaptive error correction choice, if one was made
+        self.error_correction_choice = error_correction_choice
+
+    @classmethod
+    def from_array(cls, array, border=4, **kwargs):
+        """Pack a square boolean array of modules, without quiet zone"""
+        array = np.asarray(array, dtype=bool)
+        return cls(np.packbits(array).tobytes(), array.shape[0], border, **kwargs)
+
+    @classmethod
+    def from_rows(cls, rows, border=4, **kwargs):
+        """Pack rows of booleans, such as qrcode's modules (None counts as light)"""
+        return cls.from_array([[bool(module) for module in row] for row in rows], border, **kwargs)
+
+    @classmethod
+    def from_qrcode(cls, qr):
+        """Pack the modules of a made qrcode.QRCode"""
+        return cls.from_rows(qr.modules, qr.border, version=qr.version, error_correction=qr.error_correction)
+
+    @classmethod
+    def from_matrix(cls, matrix, border=4, **kwargs):
+        """Pack the output of qrcode.QRCode.get_matrix(), which includes a quiet zone of border modules"""
+        array = np.asarray(matrix, dtype=bool)
+        if border:
+            array = array[border:-border, border:-border]
+        return cls.from_array(array, border, **kwargs)
+
+    @property
+    def modules_count(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+    def to_array(self, border=None):
+        """Unpack to a boolean NumPy array, with a quiet zone of border modules"""
+        border = self.border if border is None else border
+        array = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), count=self.size * self.size)
+        array = array.astype(bool).reshape(self.size, self.size)
+        if border:
+            array = np.pad(array, border)
+        return array
+
+    def get_matrix(self):
+        """Rows of booleans including the quiet zone, like qrcode.QRCode.get_matrix()"""
+        return self.to_array().tolist()
+
+    def replace(self, **changes):
+        """A copy with some attributes changed, sharing the packed modules"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return QRMatrix(**values)
+
+    def __eq__(self, other):
+        if not isinstance(other, QRMatrix):
+            return NotImplemented
+        return self.size == other.size and self.bits == other.bits
+
+    def __hash__(self):
+        return hash((self.size, self.bits))
+
+    def __reduce__(self):
+        return QRMatrix, (self.bits, self.size, self.border, self.version, self.error_correction,
+                          self.error_correction_choice)
+
+    def __repr__(self):
+        return f"QRMatrix(version={self.version}, size={self.size}, border={self.border})"
@@ -0,0 +1,93 @@
+"""Process-pool rendering for large batches.
+
+Each worker process builds its own renderer once, receives only the small
+form data dictionary for a record, and writes the encoded image itself, so
+no pixel data crosses process boundaries. When writing to an archive, the
+workers return the encoded bytes and the parent process appends them.
+Instrumentation events raised in a worker travel back with the report entry
+and are emitted to the hooks of the parent process. The number of records in flight
+is capped, which keeps memory flat however long the input is.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import instrument
+from .batch import BatchGenerator, BatchStats, write_to_sink
+
+
+# Generator owned by the current worker process
+_worker_generator = None
+# Instrumentation events of the task running in this worker
+_worker_events = []
+
+
+def _init_worker(options, collect_events=False):
+    """Create the per-process BatchGenerator"""
+    global _worker_generator
+    _worker_generator = BatchGenerator(**options)
+    if collect_events:
+        instrument.add_hook(_worker_events.append)
+
+
+def _render_task(index, data):
+    """Render and save one record inside a worker process"""
+    del _worker_events[:]
+    entry = _worker_generator.render_one(index, data)
+    if _worker_events:
+        entry["events"] = list(_worker_events)
+    return entry
+
+
+class ParallelBatchGenerator:
+    """Spread batch rendering across a pool of worker processes"""
+
+    def __init__(self, workers=None, max_pending=None, **options):
+        self.workers = workers or os.cpu_count() or 1
+        # A few tasks per worker keeps every core busy without queueing the whole input
+        self.max_pending = max_pending or self.workers * 4
+        self.options = options
+        self.output_dir = options.get("output_dir", "lifetag_output")
+
+    def run(self, records, progress=None, report=None, sink=None):
+        """Render every record across the pool and return a BatchStats"""
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+        stats = BatchStats()
+        start = time.perf_counter()
+        pending = {}
+
+        def collect(done):
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    entry = future.result()
+                    for event in entry.pop("events", ()):
+                        instrument.emit(event)
+                    if sink:
+                        write_to_sink(entry, sink)
+                    stats.add_rendered(entry)
+                    if report:
+                        report(entry)
+                except Exception as e:
+                    stats.add_error(index, [str(e)])
+            if progress:
+                stats.elapsed = time.perf_counter() - start
+                progress(stats)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.options, instrument.has_hooks())) as pool:
+            for index, data in records:
+                # Wait for a slot before reading further into the input
+                if len(pending) >= self.max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+                pending[pool.submit(_render_task, index, data)] = index
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        stats.elapsed = time.perf_counter() - start
+        return stats
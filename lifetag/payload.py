@@ -0,0 +1,134 @@
+"""QR payload encodings.
+
+The desktop apps embed `json.dumps(qr_data)`, which repeats every key and
+adds whitespace. Smaller payloads give smaller QR versions, which encode and
+render faster and scan more reliably on low-end phone cameras. Supported
+formats:
+
+    json     the original nested JSON (default, readable by any scanner app)
+    compact  "LT1" followed by a JSON array of the fields in a fixed order;
+             every field has a slot, null where qr_data has no such key
+    base45   "LT1Z:" followed by base45(zlib(compact)), which fits the QR
+             alphanumeric mode
+
+decode_payload() accepts all three and returns the qr_data dictionary,
+equal to the one that was encoded.
+"""
+import json
+import zlib
+
+
+PAYLOAD_FORMATS = ("json", "compact", "base45")
+
+COMPACT_PREFIX = "LT1"
+BASE45_PREFIX = "LT1Z:"
+
+# Field order of the compact array, as (section, key) pairs
+COMPACT_FIELDS = [
+    ("personal_info", "name"),
+    ("personal_info", "dob"),
+    ("personal_info", "blood_group"),
+    ("medical_info", "allergies"),
+    ("medical_info", "conditions"),
+    ("medical_info", "medications"),
+    ("emergency_contact", "name"),
+    ("emergency_contact", "phone"),
+    ("emergency_contact", "relationship"),
+    (None, "address"),
+    (None, "additional_info"),
+    (None, "emergency_number"),
+]
+
+BASE45_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+BASE45_VALUES = {char: value for value, char in enumerate(BASE45_CHARSET)}
+
+
+def base45_encode(data):
+    """Encode bytes with the RFC 9285 base45 alphabet"""
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars.extend((BASE45_CHARSET[c], BASE45_CHARSET[d], BASE45_CHARSET[e]))
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars.extend((BASE45_CHARSET[c], BASE45_CHARSET[d]))
+    return "".join(chars)
+
+
+def base45_decode(text):
+    """Decode an RFC 9285 base45 string"""
+    try:
+        values = [BASE45_VALUES[char] for char in text]
+    except KeyError as e:
+        raise ValueError(f"Invalid base45 character {e.args[0]!r}")
+    if len(values) % 3 == 1:
+        raise ValueError("Invalid base45 length")
+
+    data = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            value = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            if value > 0xFFFF:
+                raise ValueError("Invalid base45 triplet")
+            data.extend(divmod(value, 256))
+        else:
+            value = chunk[0] + chunk[1] * 45
+            if value > 0xFF:
+                raise ValueError("Invalid base45 pair")
+            data.append(value)
+    return bytes(data)
+
+
+def compact_fields(qr_data):
+    """Flatten qr_data into the positional compact list, one slot per field"""
+    fields = []
+    for section, key in COMPACT_FIELDS:
+        source = qr_data.get(section, {}) if section else qr_data
+        # None marks a missing key, so that "" still decodes as ""
+        fields.append(source.get(key))
+    return fields
+
+
+def encode_payload(qr_data, payload_format="json"):
+    """Serialize qr_data into the text stored in the QR code"""
+    if payload_format == "json":
+        return json.dumps(qr_data)
+
+    compact = json.dumps(compact_fields(qr_data), separators=(",", ":"), ensure_ascii=False)
+    if payload_format == "compact":
+        return COMPACT_PREFIX + compact
+    if payload_format == "base45":
+        return BASE45_PREFIX + base45_encode(zlib.compress(compact.encode("utf-8"), 9))
+
+    raise ValueError(f"Unknown payload format '{payload_format}', expected one of: {', '.join(PAYLOAD_FORMATS)}")
+
+
+def decode_payload(text):
+    """Parse QR text in any supported format back into qr_data"""
+    if text.startswith(BASE45_PREFIX):
+        compact = zlib.decompress(base45_decode(text[len(BASE45_PREFIX):])).decode("utf-8")
+    elif text.startswith(COMPACT_PREFIX):
+        compact = text[len(COMPACT_PREFIX):]
+    else:
+        return json.loads(text)
+
+    fields = json.loads(compact)
+    qr_data = {
+        "type": "MEDICAL_EMERGENCY",
+        "personal_info": {},
+        "medical_info": {},
+        "emergency_contact": {},
+    }
+    if not isinstance(fields, list) or len(fields) != len(COMPACT_FIELDS):
+        raise ValueError(f"Expected {len(COMPACT_FIELDS)} compact fields")
+    for (section, key), value in zip(COMPACT_FIELDS, fields):
+        if value is None:
+            continue
+        if section:
+            qr_data[section][key] = value
+        else:
+            qr_data[key] = value
+    return qr_data
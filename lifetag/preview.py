@@ -0,0 +1,126 @@
+"""Debounced live preview for the Tk apps.
+
+Edits to the form restart a short timer; when the user pauses, the form is
+read on the Tk thread and rendered on a single background worker. The
+finished image is handed back to the Tk thread through root.after polling,
+since Tk widgets must only be touched from the thread running mainloop.
+
+Every edit bumps a generation counter. A render that is still queued when
+new input arrives is cancelled, and the result of one already running is
+dropped, so only the latest form state ever reaches the screen. The form
+data a preview was rendered from is handed back with it, so the app can
+save exactly what is on screen, and on_edit lets it mark an earlier
+render stale as soon as the form changes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LivePreview:
+    """Render form previews in the background while the user types"""
+
+    def __init__(self, root, get_data, render, show, on_edit=None, delay_ms=300, poll_ms=15):
+        """
+        get_data() runs on the Tk thread and returns the form data, or None to skip.
+        render(data) runs on the worker thread and returns a preview.
+        show(preview, data) runs on the Tk thread with the latest finished preview
+        and the form data it was rendered from.
+        on_edit() runs on the Tk thread after every edit, even with the preview off.
+        """
+        self.root = root
+        self.get_data = get_data
+        self.render = render
+        self.show = show
+        self.on_edit = on_edit
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+        self.enabled = False
+        self.generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lifetag-preview")
+        self._future = None
+        self._after_id = None
+        self._poll_id = None
+
+    def watch(self, variables=(), text_widgets=()):
+        """Schedule a preview whenever a StringVar or Text widget changes"""
+        for var in variables:
+            var.trace_add("write", self._on_edit)
+        for widget in text_widgets:
+            widget.bind("<<Modified>>", self._on_text_modified, add="+")
+
+    def _on_text_modified(self, event):
+        # Text only fires <<Modified>> again after the flag is reset
+        event.widget.edit_modified(False)
+        self._on_edit()
+
+    def _on_edit(self, *args):
+        if self.on_edit is not None:
+            self.on_edit()
+        self.schedule()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self.schedule()
+        else:
+            self.cancel()
+
+    def schedule(self, *args):
+        """Restart the debounce timer after an edit"""
+        if not self.enabled:
+            return
+        # Anything rendered for the previous input is now stale
+        self.generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(self.delay_ms, self._start)
+
+    def _start(self):
+        self._after_id = None
+        data = self.get_data()
+        if data is None:
+            return
+
+        if self._future is not None:
+            self._future.cancel()
+        self._future = self._executor.submit(self._render, self.generation, data)
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _render(self, generation, data):
+        # Skip work that was superseded while waiting for the worker
+        if generation != self.generation:
+            return generation, data, None
+        return generation, data, self.render(data)
+
+    def _poll(self):
+        """Check for a finished render without blocking the Tk thread"""
+        self._poll_id = None
+        future = self._future
+        if future is None or future.cancelled():
+            return
+        if not future.done():
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+            return
+
+        self._future = None
+        try:
+            generation, data, preview = future.result()
+        except Exception:
+            # A broken intermediate edit shouldn't interrupt typing
+            return
+        if preview is not None and generation == self.generation:
+            self.show(preview, data)
+
+    def cancel(self):
+        """Drop any pending or running preview"""
+        self.generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,131 @@
+"""Memoized QR encoding shared across themes and sizes.
+
+Choosing the mask pattern in qrcode's make() builds the symbol eight times
+and scores each one, which is most of the cost of encoding. The result only
+depends on the payload, the error correction level and the version, not on
+colors, theme or output size, so encoded modules are kept in an in-process
+LRU keyed by (payload hash, level, version). Rendering one person as a
+standard code, a floral wallpaper and a preview then encodes the QR once.
+
+Entries are QRMatrix objects, so a cached symbol takes a few kilobytes.
+With a directory set, they are also stored on disk as their packed bits,
+so batch runs and worker processes can share them. Each file starts with
+a short header naming its version and level; a file whose header or
+length doesn't match its key, such as one cut short by a crash, is a miss.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+
+import qrcode
+
+from .fileio import write_atomic
+from .matrix import QRMatrix
+
+
+# Start of every cached matrix file, followed by the version and level bytes
+FILE_MAGIC = b"LTQM1"
+
+
+class QRCodeCache:
+    """LRU of encoded QR matrices, optionally backed by a directory"""
+
+    def __init__(self, max_entries=1024, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(payload, error_correction, version):
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return digest, error_correction, version
+
+    def encode(self, payload, error_correction, version=None, border=4):
+        """Encode payload into a QRMatrix, fitting the version unless one is given"""
+        qr = qrcode.QRCode(version=version, error_correction=error_correction, border=border)
+        qr.add_data(payload)
+        # Fitting only measures the data; the expensive part is choosing the mask
+        if version is None:
+            qr.best_fit()
+
+        key = self.key(payload, qr.error_correction, qr.version)
+        matrix = self.get(key)
+        if matrix is None:
+            qr.make(fit=False)
+            matrix = QRMatrix.from_qrcode(qr)
+            self.put(key, matrix)
+        return matrix if matrix.border == border else matrix.replace(border=border)
+
+    def get(self, key):
+        """Return the QRMatrix for a key, or None on a miss"""
+        matrix = self._entries.get(key)
+        if matrix is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return matrix
+
+        matrix = self._load(key)
+        if matrix is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, matrix)
+        return matrix
+
+    def put(self, key, matrix):
+        self._remember(key, matrix)
+        if self.directory:
+            self._store(key, matrix)
+
+    def _remember(self, key, matrix):
+        self._entries[key] = matrix
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        digest, error_correction, version = key
+        return os.path.join(self.directory, digest[:2], f"{digest}_{error_correction}_{version}.qrm")
+
+    def _store(self, key, matrix):
+        """Write the packed modules; the size follows from the version in the key"""
+        _digest, error_correction, version = key
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, FILE_MAGIC + bytes((version, error_correction)) + matrix.bits)
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        _digest, error_correction, version = key
+        size = version * 4 + 17
+        header = FILE_MAGIC + bytes((version, error_correction))
+        if not data.startswith(header) or len(data) != len(header) + (size * size + 7) // 8:
+            return None
+        return QRMatrix(data[len(header):], size, version=version, error_correction=error_correction)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+# Shared by every renderer in the process
+qr_cache = QRCodeCache()
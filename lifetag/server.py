@@ -0,0 +1,327 @@
+"""Asyncio HTTP service rendering LifeTags on demand.
+
+Usage:
+    python -m lifetag.server --port 8080 -j 4
+    curl -X POST --data @qr_data.json "http://127.0.0.1:8080/render?theme=floral" -o tag.png
+
+POST /render takes a JSON body in the QR data schema and returns the PNG.
+The theme (standard or floral) and payload_format are query parameters.
+GET /stats returns the service counters.
+
+The event loop only parses requests; rendering runs in a process pool. The
+number of distinct renders queued or running is capped, and requests beyond
+that get 429 Too Many Requests instead of piling up. Requests are validated
+before they are admitted, so a malformed record or one too large for any
+QR code is answered with a 4xx right away and never takes a queue slot.
+Identical requests arriving while a render is in flight share its result. Nothing here imports
+tkinter, so the service starts quickly in a container.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from qrcode.exceptions import DataOverflowError
+
+from .batch import BatchGenerator
+from .cache import render_key
+from .ecc import payload_fits
+from .engine import RENDERERS, form_data_from_qr_data, get_renderer, validate_qr_data, validate_record
+from .payload import PAYLOAD_FORMATS
+
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+# Generators owned by the current worker process, one per option set; the
+# emergency number comes from clients, so only the most recent few are kept
+_worker_generators = OrderedDict()
+MAX_WORKER_GENERATORS = 16
+_worker_cache_dir = None
+
+
+def _init_worker(cache_dir):
+    global _worker_cache_dir
+    _worker_cache_dir = cache_dir
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def _render_task(theme, payload_format, emergency_number, data):
+    """Render one record to PNG bytes inside a worker process"""
+    key = (theme, payload_format, emergency_number)
+    generator = _worker_generators.get(key)
+    if generator is None:
+        generator = BatchGenerator(theme=theme, output_dir=None, payload_format=payload_format,
+                                   emergency_number=emergency_number, cache_dir=_worker_cache_dir)
+        _worker_generators[key] = generator
+        if len(_worker_generators) > MAX_WORKER_GENERATORS:
+            _worker_generators.popitem(last=False)
+    else:
+        _worker_generators.move_to_end(key)
+    files, metadata = generator.render_files(data)
+    return files[".png"], metadata
+
+
+class HTTPError(Exception):
+    """An error answered with a status code and a JSON message"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class RenderServer:
+    """HTTP front end for a pool of rendering processes"""
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=None, max_pending=None,
+                 theme="floral", cache_dir=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        # A few renders per worker keeps every core busy while bounding latency
+        self.max_pending = max_pending or self.workers * 4
+        self.theme = theme
+        self.cache_dir = cache_dir
+        self.pool = None
+        self.server = None
+        self._inflight = {}
+        self.requests = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.busy = 0
+        self.errors = 0
+
+    async def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(self.cache_dir,))
+        # Start the workers before accepting connections; workers forked later would
+        # inherit client sockets and hold them open after the server closes them
+        await asyncio.get_running_loop().run_in_executor(self.pool, _worker_ready)
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # Report the real port when started with port 0
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serving LifeTags on http://{self.host}:{self.port}", file=sys.stderr)
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "renders": self.renders,
+            "coalesced": self.coalesced,
+            "busy": self.busy,
+            "errors": self.errors,
+            "in_flight": len(self._inflight),
+            "max_pending": self.max_pending,
+            "workers": self.workers,
+        }
+
+    def check_record(self, theme, payload_format, emergency_number, data):
+        """Raise a 4xx HTTPError for a record the workers would fail to render"""
+        errors = validate_record(data)
+        if errors:
+            raise HTTPError(400, " ".join(errors))
+
+        # Build the payload exactly as the worker's renderer will; renderers are cheap to create
+        kwargs = {"payload_format": payload_format}
+        if emergency_number is not None:
+            kwargs["emergency_number"] = emergency_number
+        renderer = get_renderer(theme, **kwargs)
+        payload = renderer.encode_payload(renderer.build_qr_data(data))
+        level = renderer.min_error_correction if renderer.error_correction == "auto" else renderer.error_correction
+        if not payload_fits(payload, level):
+            raise HTTPError(413, f"The record is too large for a QR code ({len(payload)} characters)")
+
+    async def render(self, theme, payload_format, qr_data):
+        """Render qr_data, sharing the result with identical requests in flight"""
+        errors = validate_qr_data(qr_data)
+        if errors:
+            raise HTTPError(400, "; ".join(errors))
+        emergency_number = qr_data.get("emergency_number") if theme == "standard" else None
+        key = render_key(qr_data, theme=theme, payload_format=payload_format)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            # Bad requests are refused before they can use up a queue slot or be told to retry
+            data = form_data_from_qr_data(qr_data)
+            self.check_record(theme, payload_format, emergency_number, data)
+
+            if len(self._inflight) >= self.max_pending:
+                self.busy += 1
+                raise HTTPError(429, "Rendering queue is full, retry shortly", {"Retry-After": "1"})
+
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, _render_task, theme, payload_format,
+                                          emergency_number, data)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _future: self._inflight.pop(key, None))
+            self.renders += 1
+
+        # A client hanging up must not cancel a render other requests are waiting on
+        try:
+            return await asyncio.shield(future)
+        except DataOverflowError:
+            raise HTTPError(413, "The record is too large for a QR code")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                try:
+                    status, content_type, payload, extra = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, content_type, extra = e.status, "application/json", e.headers
+                    payload = json.dumps({"error": str(e)}).encode("utf-8")
+                except Exception as e:
+                    self.errors += 1
+                    status, content_type, extra = 500, "application/json", {}
+                    payload = json.dumps({"error": str(e)}).encode("utf-8")
+
+                self.write_response(writer, status, content_type, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            payload = json.dumps({"error": str(e)}).encode("utf-8")
+            self.write_response(writer, e.status, "application/json", payload, e.headers, False)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """Read one request, returning (method, target, headers, body) or None at EOF"""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # Only plain digits; int() would also take signs, spaces and underscores
+        value = headers.get("content-length", "") or "0"
+        if not (value.isascii() and value.isdigit()):
+            raise HTTPError(400, "Invalid Content-Length header")
+        length = int(value)
+        if length > MAX_BODY:
+            raise HTTPError(413, f"Request body is limited to {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    async def dispatch(self, method, target, body):
+        """Route a request, returning (status, content type, body, extra headers)"""
+        self.requests += 1
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        if url.path == "/stats":
+            return 200, "application/json", json.dumps(self.stats()).encode("utf-8"), {}
+        if url.path != "/render":
+            raise HTTPError(404, f"No route for {url.path}")
+        if method != "POST":
+            raise HTTPError(405, "Use POST with a qr_data JSON body", {"Allow": "POST"})
+
+        theme = query.get("theme", self.theme)
+        if theme not in RENDERERS:
+            raise HTTPError(400, f"Unknown theme '{theme}', expected one of: {', '.join(RENDERERS)}")
+        payload_format = query.get("payload_format", "json")
+        if payload_format not in PAYLOAD_FORMATS:
+            raise HTTPError(400, f"Unknown payload format '{payload_format}'")
+        try:
+            qr_data = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}")
+
+        image, metadata = await self.render(theme, payload_format, qr_data)
+        extra = {
+            "X-QR-Version": str(metadata.get("version", "")),
+            "X-QR-Modules": str(metadata.get("modules", "")),
+            "X-Payload-Hash": metadata.get("payload_hash", ""),
+        }
+        return 200, "image/png", image, extra
+
+    def write_response(self, writer, status, content_type, body, extra, keep_alive):
+        lines = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve LifeTag wallpapers over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--theme", default="floral", choices=list(RENDERERS), help="default theme")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="render processes (0 uses every core)")
+    parser.add_argument("--max-pending", type=int, help="distinct renders queued before answering 429")
+    parser.add_argument("--cache-dir", help="reuse renders from this cache directory")
+    args = parser.parse_args(argv)
+
+    server = RenderServer(args.host, args.port, workers=args.workers or None,
+                          max_pending=args.max_pending, theme=args.theme, cache_dir=args.cache_dir)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Per-user settings with named profiles.
+
+The info message and emergency number used to live in
+qr_info_settings.json in whatever directory the app was started from.
+Settings now sit in the per-user config directory and are read once into
+a Settings object; a legacy file found in the working directory is
+imported the first time. Saving writes a temporary file and renames it
+over the old one, so a crash can't leave half a file, and save_async does
+that on a background thread so the Tk callback returns immediately.
+
+Profiles hold alternative values, such as the emergency number of another
+country. A profile only stores what differs: lookups fall back to the
+"default" profile and then to DEFAULTS.
+
+File format:
+
+    {"active": "default",
+     "profiles": {"default": {"info_message": "...", "emergency_number": "911"},
+                  "uk": {"emergency_number": "999"}}}
+"""
+import copy
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .fileio import write_atomic
+
+
+DEFAULTS = {
+    "info_message": "This QR code contains vital medical information for emergency use.",
+    "emergency_number": "911",
+}
+
+DEFAULT_PROFILE = "default"
+
+# Where the apps saved their settings before, relative to the working directory
+LEGACY_PATH = "qr_info_settings.json"
+
+
+def default_settings_path():
+    """Per-user location of the settings file"""
+    if os.name == "nt":
+        base = os.environ.get("APPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config"))
+    return os.path.join(base, "lifetag", "settings.json")
+
+
+def write_settings(path, text):
+    """Write the settings file, creating its directory and syncing it to disk"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    write_atomic(path, text, sync=True)
+
+
+class Settings:
+    """Settings loaded once from disk, with named profiles
+
+    load_error holds a message for the user if the file existed but
+    couldn't be read, in which case the defaults are used and the file is
+    only replaced on save, or if imported legacy settings couldn't be
+    written, in which case they are kept in memory. Loading never raises.
+    """
+
+    def __init__(self, path=None, legacy_path=LEGACY_PATH):
+        self.path = path or default_settings_path()
+        self.legacy_path = legacy_path
+        self.load_error = None
+        self.migrated = False
+        self.active = DEFAULT_PROFILE
+        self.profiles = {DEFAULT_PROFILE: {}}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.load()
+
+    def load(self):
+        """Read the settings file, importing the legacy file if there is none yet"""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                stored = json.load(file)
+            self.active = stored.get("active", DEFAULT_PROFILE)
+            self.profiles = {name: dict(values) for name, values in stored.get("profiles", {}).items()}
+            self.profiles.setdefault(DEFAULT_PROFILE, {})
+        except FileNotFoundError:
+            self._migrate()
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            self.load_error = f"Couldn't read {self.path}: {e}. Using the default settings."
+        if self.active not in self.profiles:
+            self.active = DEFAULT_PROFILE
+
+    def _migrate(self):
+        """Import the old single-profile settings file as the default profile"""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, encoding="utf-8") as file:
+                legacy = json.load(file)
+        except (OSError, ValueError) as e:
+            self.load_error = f"Couldn't import {self.legacy_path}: {e}. Using the default settings."
+            return
+        self.profiles[DEFAULT_PROFILE] = {key: legacy[key] for key in DEFAULTS if key in legacy}
+        try:
+            self.save()
+        except OSError as e:
+            # An unwritable config directory mustn't stop the app from starting
+            self.load_error = (f"Couldn't save settings to {self.path}: {e}. "
+                               f"The settings from {self.legacy_path} are used but not saved.")
+            return
+        self.migrated = True
+
+    def profile(self, name=None):
+        """All values of a profile (the active one by default), with fallbacks filled in"""
+        name = name or self.active
+        if name not in self.profiles:
+            raise KeyError(f"Unknown settings profile '{name}', expected one of: {', '.join(self.profiles)}")
+        values = dict(DEFAULTS)
+        values.update(self.profiles[DEFAULT_PROFILE])
+        values.update(self.profiles[name])
+        return values
+
+    def get(self, key, profile=None):
+        return self.profile(profile)[key]
+
+    def update(self, profile=None, **values):
+        """Change values of a profile, creating it if needed; call save() to keep them"""
+        with self._lock:
+            self.profiles.setdefault(profile or self.active, {}).update(values)
+
+    def set_active(self, name):
+        if name not in self.profiles:
+            raise KeyError(f"Unknown settings profile '{name}'")
+        self.active = name
+
+    def delete_profile(self, name):
+        if name == DEFAULT_PROFILE:
+            raise ValueError("The default profile can't be deleted")
+        with self._lock:
+            self.profiles.pop(name, None)
+            if self.active == name:
+                self.active = DEFAULT_PROFILE
+
+    def as_dict(self):
+        with self._lock:
+            return {"active": self.active, "profiles": copy.deepcopy(self.profiles)}
+
+    def save(self):
+        """Write the settings now"""
+        write_settings(self.path, json.dumps(self.as_dict(), indent=2, ensure_ascii=False))
+
+    def save_async(self):
+        """Write the settings on a background thread, returning a Future
+
+        The values are copied before returning, so later changes don't leak
+        into this write; writes happen one at a time, in order.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lifetag-settings")
+        text = json.dumps(self.as_dict(), indent=2, ensure_ascii=False)
+        return self._executor.submit(write_settings, self.path, text)
+
+    def close(self):
+        """Wait for pending background writes"""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_settings = None
+
+
+def get_settings():
+    """The process-wide Settings, loaded on first use"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
@@ -0,0 +1,414 @@
+"""Local record store for re-issuing tags.
+
+Records are kept in an SQLite database keyed by person id, so a tag can
+be re-issued without retyping the form or re-importing the whole CSV.
+Each row stores the form data and settings profile, a hash of them, and
+the payload hash and artifact path of the last render. A batch job
+imports its input into the store and only re-renders the records whose
+data changed since they were last rendered, or whose QR payload would
+come out different, as it does after a change of emergency number or
+payload format; "records changed since X" is a single indexed query.
+
+Lookups by name and emergency contact phone use indexed normalized keys:
+the name lowercased with whitespace collapsed, and the phone's digits.
+
+Field encryption is optional and needs the cryptography package. With a
+key, the form fields are stored as Fernet tokens, and the name and phone
+keys, the ids derived for records without one and the data hashes become
+HMACs. Names and dates of birth are easy to guess, so a plain hash of
+them could be brute-forced from a copied database; with a key, the
+database reveals none of them, while exact lookups by name or phone still
+work.
+
+Usage:
+    python -m lifetag.store people.db import employees.csv
+    python -m lifetag.store people.db changed --since 2026-10-01 > changed.jsonl
+    python -m lifetag.batch changed.jsonl -o tags --store people.db
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from .engine import FORM_FIELDS, validate_record
+from .ingest import iter_records
+
+try:
+    from cryptography.fernet import Fernet
+except ImportError:
+    Fernet = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    phone_key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    payload_hash TEXT,
+    artifact_path TEXT,
+    rendered_at REAL,
+    rendered_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS records_name ON records (name_key);
+CREATE INDEX IF NOT EXISTS records_phone ON records (phone_key);
+CREATE INDEX IF NOT EXISTS records_updated ON records (updated_at);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Writes are committed in groups; one transaction per row would make imports disk bound
+COMMIT_EVERY = 500
+
+KEY_ENVIRONMENT = "LIFETAG_STORE_KEY"
+
+# Everything stored per record besides its id: the form and the settings profile it selects
+STORED_FIELDS = FORM_FIELDS + ["profile"]
+
+
+def default_store_path():
+    """Per-user location of the record database"""
+    if os.name == "nt":
+        base = os.environ.get("APPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_DATA_HOME", os.path.join(os.path.expanduser("~"), ".local", "share"))
+    return os.path.join(base, "lifetag", "records.db")
+
+
+def generate_key():
+    """New random key for field encryption"""
+    if Fernet is None:
+        raise RuntimeError("Field encryption needs the cryptography package (pip install cryptography)")
+    return Fernet.generate_key().decode("ascii")
+
+
+def _digest(value, key=None):
+    """SHA-256 of a string, or its HMAC when a key is given"""
+    if key is None:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+    return hmac.new(key, value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def record_id(data, key=None):
+    """The record's id, or one derived from the name and date of birth when it has none"""
+    if data.get("id"):
+        return str(data["id"])
+    identity = f"{normalize_name(data.get('full_name', ''))}|{data.get('dob', '')}"
+    return "auto-" + _digest(identity, key)[:16]
+
+
+def normalize_name(name):
+    return " ".join(str(name).lower().split())
+
+
+def normalize_phone(phone):
+    return re.sub(r"\D", "", str(phone))
+
+
+def data_hash(data, key=None):
+    """Hash of the stored fields, independent of key order and missing fields"""
+    fields = {field: data.get(field, "") for field in STORED_FIELDS}
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return _digest(canonical, key)
+
+
+def parse_time(value):
+    """Unix time from a number or an ISO 8601 date or datetime (local time)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class RecordStore:
+    """SQLite store of form data keyed by person id"""
+
+    def __init__(self, path=None, key=None):
+        self.path = path or default_store_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        key = key or os.environ.get(KEY_ENVIRONMENT)
+        self._fernet = None
+        self._index_key = None
+        if key:
+            if Fernet is None:
+                raise RuntimeError("Field encryption needs the cryptography package (pip install cryptography)")
+            self._fernet = Fernet(key)
+            # A separate key for the lookup HMACs, so index values can't be used against the cipher key
+            self._index_key = hmac.new(base64.urlsafe_b64decode(key), b"lifetag-index", hashlib.sha256).digest()
+
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._pending = 0
+        self._check_key()
+
+    @property
+    def encrypted(self):
+        return self._fernet is not None
+
+    def _check_key(self):
+        """Refuse to mix plain and encrypted rows, or rows encrypted with different keys"""
+        # An HMAC of a fixed string identifies the key without revealing it
+        check = self._index("lifetag-key-check") if self.encrypted else ""
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'key_check'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta (name, value) VALUES ('key_check', ?)", (check,))
+            self.commit()
+        elif row["value"] != check:
+            self.conn.close()
+            self.conn = None
+            if not row["value"]:
+                raise ValueError(f"{self.path} isn't encrypted; open it without a key")
+            if not check:
+                raise ValueError(f"{self.path} is encrypted; set ${KEY_ENVIRONMENT} or pass its key")
+            raise ValueError(f"Wrong key for {self.path}")
+
+    def _index(self, value):
+        if self._index_key is None:
+            return value
+        return _digest(value, self._index_key)
+
+    def record_id(self, data):
+        """The record's id; derived ids are keyed like the lookup keys"""
+        return record_id(data, self._index_key)
+
+    def data_hash(self, data):
+        return data_hash(data, self._index_key)
+
+    def _dump(self, data):
+        fields = {field: str(data.get(field) or "") for field in STORED_FIELDS}
+        if self._fernet:
+            fields = {field: self._fernet.encrypt(value.encode("utf-8")).decode("ascii")
+                      for field, value in fields.items()}
+        return json.dumps(fields, ensure_ascii=False)
+
+    def _load(self, row):
+        fields = json.loads(row["data"])
+        if self._fernet:
+            fields = {field: self._fernet.decrypt(value.encode("ascii")).decode("utf-8")
+                      for field, value in fields.items()}
+        return dict(fields, id=row["id"])
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def put(self, data, now=None):
+        """Insert or update a record, returning True if its data changed
+
+        updated_at only moves when the data does, so importing the same CSV
+        again doesn't mark every record as changed.
+        """
+        identifier = self.record_id(data)
+        digest = self.data_hash(data)
+        row = self.conn.execute("SELECT data_hash FROM records WHERE id = ?", (identifier,)).fetchone()
+        if row is not None and row["data_hash"] == digest:
+            return False
+
+        values = (self._index(normalize_name(data.get("full_name", ""))),
+                  self._index(normalize_phone(data.get("emergency_contact_phone", ""))),
+                  self._dump(data), digest, now if now is not None else time.time())
+        if row is None:
+            self.conn.execute("INSERT INTO records (name_key, phone_key, data, data_hash, updated_at, id) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", values + (identifier,))
+        else:
+            self.conn.execute("UPDATE records SET name_key = ?, phone_key = ?, data = ?, data_hash = ?, "
+                              "updated_at = ? WHERE id = ?", values + (identifier,))
+        self._written()
+        return True
+
+    def get(self, identifier):
+        """Form data for an id, or None"""
+        row = self.conn.execute("SELECT * FROM records WHERE id = ?", (str(identifier),)).fetchone()
+        return self._load(row) if row else None
+
+    def delete(self, identifier):
+        deleted = self.conn.execute("DELETE FROM records WHERE id = ?", (str(identifier),)).rowcount
+        self._written()
+        return bool(deleted)
+
+    def find_by_name(self, name):
+        """Records whose full name matches, ignoring case and extra whitespace"""
+        rows = self.conn.execute("SELECT * FROM records WHERE name_key = ? ORDER BY id",
+                                 (self._index(normalize_name(name)),))
+        return [self._load(row) for row in rows]
+
+    def find_by_phone(self, phone):
+        """Records with this emergency contact phone, ignoring formatting"""
+        rows = self.conn.execute("SELECT * FROM records WHERE phone_key = ? ORDER BY id",
+                                 (self._index(normalize_phone(phone)),))
+        return [self._load(row) for row in rows]
+
+    def changed_since(self, since):
+        """Records whose data changed after a Unix time, oldest change first"""
+        rows = self.conn.execute("SELECT * FROM records WHERE updated_at > ? ORDER BY updated_at, id", (since,))
+        return (self._load(row) for row in rows)
+
+    def needs_render(self, data, payload_hash=None):
+        """True if a record's data, or the payload it would render to, differs from its last render"""
+        row = self.conn.execute("SELECT rendered_hash, payload_hash FROM records WHERE id = ?",
+                                (self.record_id(data),)).fetchone()
+        if row is None or row["rendered_hash"] != self.data_hash(data):
+            return True
+        return payload_hash is not None and row["payload_hash"] != payload_hash
+
+    def unrendered(self):
+        """Records never rendered, or changed since their last render"""
+        rows = self.conn.execute("SELECT * FROM records WHERE rendered_hash IS NULL OR rendered_hash != data_hash "
+                                 "ORDER BY updated_at, id")
+        return (self._load(row) for row in rows)
+
+    def mark_rendered(self, identifier, payload_hash, artifact_path, now=None):
+        """Record the payload hash and artifact of a finished render"""
+        self.conn.execute("UPDATE records SET payload_hash = ?, artifact_path = ?, rendered_at = ?, "
+                          "rendered_hash = data_hash WHERE id = ?",
+                          (payload_hash, artifact_path, now if now is not None else time.time(), str(identifier)))
+        self._written()
+
+    def artifact(self, identifier):
+        """(payload hash, artifact path, rendered at) of the last render, or None"""
+        row = self.conn.execute("SELECT payload_hash, artifact_path, rendered_at FROM records "
+                                "WHERE id = ? AND rendered_at IS NOT NULL", (str(identifier),)).fetchone()
+        return tuple(row) if row else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def stats(self):
+        counts = self.conn.execute("SELECT COUNT(*), COUNT(rendered_at), "
+                                   "SUM(rendered_hash IS NULL OR rendered_hash != data_hash) FROM records").fetchone()
+        return {
+            "records": counts[0],
+            "rendered": counts[1],
+            "pending": counts[2] or 0,
+            "encrypted": self.encrypted,
+            "path": self.path,
+        }
+
+    def close(self):
+        if self.conn:
+            self.commit()
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def stored_records(records, store, only_changed=True, payload_hash=None):
+    """Save (line number, form data) pairs to the store, passing on the ones to render
+
+    payload_hash(data), if given, returns the hash of the payload the
+    record would be rendered with now; records whose last render had a
+    different payload are passed on even if their data didn't change.
+    Records without an id get the one the store derived for them. Invalid
+    rows and errors pass through for the reject writer.
+    """
+    for line_number, data in records:
+        if isinstance(data, Exception) or validate_record(data):
+            yield line_number, data
+            continue
+        data = dict(data, id=store.record_id(data))
+        store.put(data)
+        if not only_changed:
+            yield line_number, data
+            continue
+        try:
+            expected = payload_hash(data) if payload_hash else None
+        except ValueError as e:
+            # Such as a profile the settings don't have
+            yield line_number, e
+            continue
+        if store.needs_render(data, expected):
+            yield line_number, data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local LifeTag record store.")
+    parser.add_argument("database", help="SQLite database file")
+    parser.add_argument("--key", help=f"field encryption key (default: ${KEY_ENVIRONMENT})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("import", help="add or update records from a CSV or JSONL file")
+    add.add_argument("input", help="CSV or JSONL file, or - for stdin")
+    add.add_argument("--input-format", choices=["csv", "jsonl"])
+    get = commands.add_parser("get", help="print one record by id")
+    get.add_argument("id")
+    find = commands.add_parser("find", help="print records by name or emergency contact phone")
+    group = find.add_mutually_exclusive_group(required=True)
+    group.add_argument("--name")
+    group.add_argument("--phone")
+    changed = commands.add_parser("changed", help="print records changed since a time as JSONL")
+    changed.add_argument("--since", help="Unix time or ISO date; without it, records changed since their last render")
+    commands.add_parser("keygen", help="print a new field encryption key")
+    commands.add_parser("stats", help="print record counts")
+    args = parser.parse_args(argv)
+
+    since = None
+    if getattr(args, "since", None):
+        try:
+            since = parse_time(args.since)
+        except ValueError:
+            parser.error(f"--since expects a Unix time or an ISO 8601 date, got '{args.since}'")
+
+    try:
+        if args.command == "keygen":
+            print(generate_key())
+            return 0
+        store = RecordStore(args.database, key=args.key)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+
+    with store:
+        if args.command == "import":
+            imported = changed_count = invalid = 0
+            for _line_number, data in iter_records(args.input, args.input_format):
+                if isinstance(data, Exception) or validate_record(data):
+                    invalid += 1
+                    continue
+                imported += 1
+                changed_count += store.put(data)
+            print(json.dumps({"imported": imported, "changed": changed_count, "invalid": invalid}))
+        elif args.command == "get":
+            data = store.get(args.id)
+            if data is None:
+                print(f"No record with id {args.id}", file=sys.stderr)
+                return 1
+            print(json.dumps(data, ensure_ascii=False))
+        elif args.command == "find":
+            found = store.find_by_name(args.name) if args.name else store.find_by_phone(args.phone)
+            for data in found:
+                print(json.dumps(data, ensure_ascii=False))
+        elif args.command == "changed":
+            records = store.changed_since(since) if since is not None else store.unrendered()
+            for data in records:
+                print(json.dumps(data, ensure_ascii=False))
+        else:
+            print(json.dumps(store.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Export one record as wallpapers for several screen sizes in one pass.
+
+The floral layout is resolution independent, so every target draws the QR
+code, banner and title directly at its own size. The payload is built and
+encoded once; the QR matrix, flower sprites and fonts are shared by all
+targets.
+
+Targets are given as WIDTHxHEIGHT, as WIDTH@W:H for an aspect ratio (for
+example 1080@20:9 is 1080x2400), or as one of the DEVICE_PRESETS names.
+"""
+import re
+
+from .engine import FloralRenderer, RenderResult
+from .instrument import stage
+
+
+# Common phone and tablet screens, portrait
+DEVICE_PRESETS = {
+    "phone-hd": (720, 1280),
+    "phone-fhd": (1080, 1920),
+    "phone-tall": (1080, 2400),
+    "phone-qhd": (1440, 2560),
+    "phone-tall-qhd": (1440, 3200),
+    "tablet": (1536, 2048),
+    "tablet-wide": (1600, 2560),
+}
+
+
+def parse_target(spec):
+    """Turn a target spec into (width, height)"""
+    spec = spec.strip().lower()
+    if spec in DEVICE_PRESETS:
+        return DEVICE_PRESETS[spec]
+
+    match = re.fullmatch(r"(\d+)x(\d+)", spec)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+
+    match = re.fullmatch(r"(\d+)@(\d+):(\d+)", spec)
+    if match:
+        width, first, second = (int(value) for value in match.groups())
+        # Portrait either way round: 20:9 and 9:20 both mean a tall screen
+        return width, round(width * max(first, second) / min(first, second))
+
+    raise ValueError(f"Invalid target '{spec}', expected WIDTHxHEIGHT, WIDTH@W:H or one of: "
+                     f"{', '.join(DEVICE_PRESETS)}")
+
+
+def parse_targets(text):
+    """Parse a comma separated list of targets, dropping duplicates"""
+    targets = []
+    for spec in text.split(","):
+        if spec.strip():
+            target = parse_target(spec)
+            if target not in targets:
+                targets.append(target)
+    return targets
+
+
+class MultiTargetRenderer:
+    """Render the floral wallpaper for several sizes from one QR encoding"""
+
+    theme = "floral"
+
+    def __init__(self, targets, **options):
+        if not targets:
+            raise ValueError("At least one target size is needed")
+        self.renderers = [FloralRenderer(width=width, height=height, **options) for width, height in targets]
+
+    @property
+    def targets(self):
+        return [(renderer.width, renderer.height) for renderer in self.renderers]
+
+    def render(self, data):
+        """Render form data for every target, returning {(width, height): RenderResult}"""
+        # The smallest QR code has the tightest module pitch, so it decides automatic error correction
+        primary = min(self.renderers, key=lambda renderer: renderer.scale)
+
+        with stage("render_targets", theme=self.theme, targets=len(self.renderers)):
+            qr_data = primary.build_qr_data(data)
+            payload = primary.encode_payload(qr_data)
+            qr = primary.make_qr(payload)
+
+            results = {}
+            for renderer in self.renderers:
+                qr_image = renderer.make_qr_image(qr)
+                image = renderer.compose(qr_image, data)
+                results[(renderer.width, renderer.height)] = RenderResult(image, qr_image, qr_data, qr, payload)
+        return results
@@ -0,0 +1,154 @@
+"""Check that a rendered QR code still reads back as the encoded matrix.
+
+Decorations, banners and alpha compositing all happen after the QR code is
+drawn, so nothing guarantees that the final image still scans. Verification
+samples the module grid back out of the finished image: the renderer knows
+where the QR code was placed and the rasterizer knows where each module's
+center is, so every module is read by averaging a few pixels around its
+center, converted to luminance and thresholded with Otsu's method, as a
+scanner's binarizer would. All of it is NumPy indexing over the QR area,
+a few milliseconds per image, small next to rendering and encoding it.
+
+The sampled grid is compared with the source matrix. Module errors are
+reported as a bit error rate and against the error correction budget: the
+share of codewords the Reed-Solomon blocks can repair. Each wrong module
+is assumed to land in a different codeword, the worst case. Errors in the
+quiet zone or the finder patterns stop a scanner from locating the code at
+all, so any of those fail verification on their own, as does weak
+contrast between dark and light modules.
+"""
+import numpy as np
+from qrcode.base import rs_blocks
+
+from .ecc import level_name
+from .instrument import stage
+from .raster import module_centers
+
+
+# Share of the error correction budget that sampling errors may use; the rest is
+# left for real damage, glare and blur
+MAX_BUDGET_USED = 0.5
+
+# Minimum luminance difference between the dark and light module means, 0 to 1
+MIN_CONTRAST = 0.4
+
+
+def ec_budget(version, error_correction):
+    """Share of codewords the error correction can repair, for the weakest block"""
+    return min(((block.total_count - block.data_count) // 2) / block.total_count
+               for block in rs_blocks(version, error_correction))
+
+
+def codeword_count(version, error_correction):
+    return sum(block.total_count for block in rs_blocks(version, error_correction))
+
+
+def otsu_threshold(values):
+    """Threshold between the two luminance clusters of a set of 0-255 values"""
+    values = values.ravel()
+    histogram = np.bincount(values.astype(np.uint8), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(histogram)
+    total = weight[-1]
+    mean = np.cumsum(histogram * levels)
+    # Between-class variance for every split; empty classes score zero
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (mean[-1] * weight - mean * total) ** 2 / (weight * (total - weight))
+    variance[~np.isfinite(variance)] = 0
+    split = int(np.argmax(variance)) + 1
+
+    # Halfway between the two clusters, since a split next to one of them is just as good to Otsu
+    low, high = values[values < split], values[values >= split]
+    if not low.size or not high.size:
+        return float(split)
+    return float(low.mean() + high.mean()) / 2
+
+
+def finder_mask(size, border):
+    """Modules of the three finder patterns and their separators, in the bordered grid"""
+    count = size + 2 * border
+    mask = np.zeros((count, count), dtype=bool)
+    end = border + size
+    mask[border:border + 8, border:border + 8] = True
+    mask[border:border + 8, end - 8:end] = True
+    mask[end - 8:end, border:border + 8] = True
+    return mask
+
+
+def sample_modules(image, placement, count):
+    """Mean luminance around each module center of a count x count grid placed at (left, top, size)"""
+    left, top, size = placement
+    region = image.crop((left, top, left + size, top + size))
+    if region.mode not in ("RGB", "RGBA", "L"):
+        region = region.convert("RGB")
+    pixels = np.asarray(region)
+
+    centers = module_centers(count, size)
+    # Average the middle half of each module, away from anti-aliased or blurred edges
+    reach = max(0, size // count // 4)
+    offsets = np.arange(-reach, reach + 1)
+    index = np.clip(centers[:, None] + offsets[None, :], 0, size - 1).ravel()
+    # Only the sampled pixels are converted to luminance
+    samples = pixels.take(index, axis=0).take(index, axis=1)
+    if samples.ndim == 3:
+        samples = samples[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return samples.reshape(count, offsets.size, count, offsets.size).mean(axis=(1, 3))
+
+
+def verify_qr(image, qr, placement, max_budget_used=MAX_BUDGET_USED, min_contrast=MIN_CONTRAST):
+    """Compare the modules visible in image with a QRMatrix drawn at placement
+
+    Returns a dictionary for the render metadata; "ok" is False when the
+    code isn't safe to rely on.
+    """
+    expected = qr.to_array()
+    count = expected.shape[0]
+
+    with stage("verify", modules=qr.modules_count) as step:
+        luminance = sample_modules(image, placement, count)
+        threshold = otsu_threshold(luminance)
+        dark = luminance < threshold
+        errors = dark != expected
+
+        symbol = np.zeros_like(errors)
+        symbol[qr.border:qr.border + qr.size, qr.border:qr.border + qr.size] = True
+        module_errors = int(errors[symbol].sum())
+        quiet_zone_errors = int(errors[~symbol].sum())
+        finder_errors = int(errors[finder_mask(qr.size, qr.border)].sum())
+
+        dark_mean = luminance[expected].mean() if expected.any() else 0.0
+        light_mean = luminance[~expected].mean()
+        contrast = max(0.0, float(light_mean - dark_mean) / 255)
+
+        budget = ec_budget(qr.version, qr.error_correction)
+        codeword_errors = min(1.0, module_errors / codeword_count(qr.version, qr.error_correction))
+        budget_used = codeword_errors / budget
+
+        problems = []
+        if quiet_zone_errors:
+            problems.append(f"{quiet_zone_errors} quiet zone modules wrong")
+        if finder_errors:
+            problems.append(f"{finder_errors} finder pattern modules wrong")
+        if contrast < min_contrast:
+            problems.append(f"contrast {contrast:.2f} below {min_contrast}")
+        if budget_used > max_budget_used:
+            problems.append(f"errors use {budget_used:.0%} of the {level_name(qr.error_correction)} budget")
+        step.set(module_errors=module_errors, ok=not problems)
+
+    return {
+        "ok": not problems,
+        "module_errors": module_errors,
+        "bit_error_rate": round(module_errors / (qr.size * qr.size), 6),
+        "quiet_zone_errors": quiet_zone_errors,
+        "finder_errors": finder_errors,
+        "contrast": round(contrast, 3),
+        "threshold": round(threshold, 1),
+        "ec_budget": round(budget, 4),
+        "budget_used": round(budget_used, 4),
+        "problems": problems,
+    }
+
+
+def verify_render(renderer, result, **limits):
+    """Verify a RenderResult against the placement its renderer used"""
+    return verify_qr(result.image, result.qr, renderer.qr_placement(result.qr), **limits)
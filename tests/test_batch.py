@@ -0,0 +1,48 @@
+import json
+
+from lifetag.batch import main
+
+
+def test_records_are_numbered_by_input_line(tmp_path, capsys):
+    source = tmp_path / "people.csv"
+    source.write_text("full_name,blood_group,emergency_contact_name,emergency_contact_phone\n"
+                      "Ann,O+,Bob,123\n"
+                      "Bad,,Bob,123\n"
+                      "Cid,A+,Dee,456\n", encoding="utf-8")
+    output = tmp_path / "tags"
+    rejects = tmp_path / "rejects.jsonl"
+    report = tmp_path / "report.jsonl"
+
+    status = main([str(source), "-o", str(output), "--theme", "standard",
+                   "--rejects", str(rejects), "--report", str(report)])
+
+    assert status == 1
+    assert json.loads(capsys.readouterr().out)["rendered"] == 2
+    assert [json.loads(line)["line"] for line in rejects.read_text().splitlines()] == [3]
+    assert [json.loads(line)["index"] for line in report.read_text().splitlines()] == [2, 4]
+    assert sorted(path.name for path in output.iterdir()) == ["000002_Ann.png", "000004_Cid.png"]
+
+
+def test_store_rerenders_when_the_payload_changes(tmp_path, capsys):
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"active": "default", "profiles": {
+        "default": {"emergency_number": "911"}, "uk": {"emergency_number": "999"}}}), encoding="utf-8")
+    source = tmp_path / "people.jsonl"
+    record = {"full_name": "Ann", "blood_group": "O+", "emergency_contact_name": "Bob",
+              "emergency_contact_phone": "123", "profile": "uk"}
+    base = ["-o", str(tmp_path / "tags"), "--theme", "standard", "--settings", str(settings),
+            "--store", str(tmp_path / "records.db")]
+
+    def rendered(record, *options):
+        source.write_text(json.dumps(record) + "\n", encoding="utf-8")
+        assert main([str(source)] + base + list(options)) == 0
+        return json.loads(capsys.readouterr().out)["rendered"]
+
+    assert rendered(record) == 1
+    assert rendered(record) == 0
+    assert rendered(dict(record, profile="default")) == 1
+    assert rendered(dict(record, profile="default"), "--emergency-number", "112") == 1
+    assert rendered(dict(record, profile="default"), "--emergency-number", "112") == 0
+    assert rendered(dict(record, profile="default"), "--emergency-number", "112",
+                    "--payload-format", "compact") == 1
+
@@ -0,0 +1,39 @@
+from lifetag.cache import MemoryRenderCache, RenderCache
+
+
+KEY = "ab" * 32
+
+
+def test_overwrite_replaces_entry_size(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=10 ** 6)
+    for i in range(5):
+        cache.put(KEY, b"x" * 1000, {"i": i})
+    meta_bytes = len(b'{"i": 4}')
+    assert cache.total_bytes == 1000 + meta_bytes
+
+    # Rewriting without metadata drops the old metadata file too
+    cache.put(KEY, b"x" * 500)
+    assert cache.total_bytes == 500
+    assert RenderCache(str(tmp_path)).total_bytes == 500
+    assert cache.get(KEY) == (b"x" * 500, {})
+
+
+def test_overwrite_does_not_evict(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=2500)
+    for _ in range(10):
+        cache.put(KEY, b"x" * 1000)
+    assert cache.evictions == 0
+    assert cache.get(KEY) is not None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryRenderCache(max_bytes=2500)
+    cache.put("a", b"x" * 1000)
+    cache.put("b", b"x" * 1000)
+    cache.put("a", b"y" * 1000)
+    assert cache.total_bytes == 2000
+
+    cache.put("c", b"z" * 1000)
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"y" * 1000, {})
+    assert cache.total_bytes == 2000
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from lifetag.fileio import write_atomic
+
+
+def test_writes_bytes_and_text(tmp_path):
+    path = tmp_path / "file"
+    write_atomic(str(path), b"\x00\x01")
+    assert path.read_bytes() == b"\x00\x01"
+    write_atomic(str(path), "café", sync=True)
+    assert path.read_bytes() == "café".encode("utf-8")
+    assert os.listdir(tmp_path) == ["file"]
+
+
+def test_failed_write_keeps_old_file_and_removes_temp_file(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"old")
+    with pytest.raises(TypeError):
+        write_atomic(str(path), 42)
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["file"]
@@ -0,0 +1,53 @@
+import pickle
+from itertools import combinations
+
+import pytest
+
+from lifetag.engine import FloralRenderer
+from lifetag.layout import FlowerLayout, circle_touches_rect, generate_layout
+from lifetag.targets import DEVICE_PRESETS
+
+
+@pytest.fixture(scope="module")
+def zones():
+    return FloralRenderer().reference_zones()
+
+
+@pytest.mark.parametrize("seed", [0, 7, 12345])
+def test_same_seed_gives_same_layout(zones, seed):
+    layout = generate_layout(seed, zones)
+    assert generate_layout(seed, zones) == layout
+    assert layout.key() == generate_layout(seed, zones).key()
+    assert layout.flowers
+
+
+def test_different_seeds_differ(zones):
+    assert generate_layout(1, zones) != generate_layout(2, zones)
+
+
+def test_layout_survives_json_and_pickle(tmp_path, zones):
+    layout = generate_layout(7, zones)
+    path = tmp_path / "layout.json"
+    layout.save(str(path))
+    assert FlowerLayout.load(str(path)) == layout
+    assert pickle.loads(pickle.dumps(layout)) == layout
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_flowers_keep_clear_of_zones_and_each_other(zones, seed):
+    layout = generate_layout(seed, zones)
+    for x, y, size, _color in layout.flowers:
+        for name, rect in zones:
+            assert not circle_touches_rect(x, y, size, rect), f"flower at {x},{y} touches the {name}"
+    for (x1, y1, r1, _), (x2, y2, r2, _) in combinations(layout.flowers, 2):
+        assert (x1 - x2) ** 2 + (y1 - y2) ** 2 >= (r1 + r2) ** 2
+
+
+@pytest.mark.parametrize("size", sorted(set(DEVICE_PRESETS.values())) + [(270, 480)])
+def test_scaled_flowers_keep_clear_of_zones(zones, size):
+    width, height = size
+    renderer = FloralRenderer(width=width, height=height)
+    scaled_zones = renderer.exclusion_zones()
+    for x, y, radius, _color in renderer.flower_layout().scaled(width, height):
+        for name, rect in scaled_zones:
+            assert not circle_touches_rect(x, y, radius, rect), f"{size}: flower at {x},{y} touches the {name}"
@@ -0,0 +1,59 @@
+import pytest
+
+from lifetag.engine import build_qr_data
+from lifetag.payload import (
+    COMPACT_PREFIX, PAYLOAD_FORMATS, base45_decode, base45_encode, decode_payload, encode_payload,
+)
+
+
+RECORD = {
+    "full_name": "Jane Doe",
+    "dob": "1990-04-01",
+    "blood_group": "O-",
+    "allergies": "Penicillin",
+    "medical_conditions": "",
+    "medications": "",
+    "emergency_contact_name": "John Doe",
+    "emergency_contact_phone": "+1 555 0100",
+    "emergency_contact_relation": "",
+    "address": "",
+    "additional_info": "",
+}
+
+# RFC 9285 section 4.3 and 4.4 examples
+RFC_9285_VECTORS = [
+    (b"AB", "BB8"),
+    (b"Hello!!", "%69 VD92EX0"),
+    (b"base-45", "UJCLQE7W581"),
+    (b"ietf!", "QED8WEX0"),
+]
+
+
+@pytest.mark.parametrize("data, text", RFC_9285_VECTORS)
+def test_base45_rfc_vectors(data, text):
+    assert base45_encode(data) == text
+    assert base45_decode(text) == data
+
+
+@pytest.mark.parametrize("text", ["GGW", "A", "aB8"])
+def test_base45_rejects_invalid_input(text):
+    with pytest.raises(ValueError):
+        base45_decode(text)
+
+
+@pytest.mark.parametrize("payload_format", PAYLOAD_FORMATS)
+@pytest.mark.parametrize("emergency_number", [None, "", "112"])
+def test_payload_round_trip(payload_format, emergency_number):
+    qr_data = build_qr_data(RECORD, emergency_number)
+    assert decode_payload(encode_payload(qr_data, payload_format)) == qr_data
+
+
+@pytest.mark.parametrize("payload_format", PAYLOAD_FORMATS)
+def test_payload_round_trip_all_empty(payload_format):
+    qr_data = build_qr_data({}, "")
+    assert decode_payload(encode_payload(qr_data, payload_format)) == qr_data
+
+
+def test_rejects_compact_payload_with_missing_fields():
+    with pytest.raises(ValueError):
+        decode_payload(COMPACT_PREFIX + '["Jane Doe","","O-"]')
@@ -0,0 +1,47 @@
+import glob
+
+import pytest
+
+from lifetag.qrcache import FILE_MAGIC, QRCodeCache
+
+
+PAYLOAD = "hello world"
+LEVEL = 3
+
+
+@pytest.fixture
+def cached_file(tmp_path):
+    expected = QRCodeCache(directory=str(tmp_path)).encode(PAYLOAD, LEVEL)
+    [path] = glob.glob(str(tmp_path / "*" / "*.qrm"))
+    return expected, path
+
+
+def test_disk_hit(tmp_path, cached_file):
+    expected, _path = cached_file
+    cache = QRCodeCache(directory=str(tmp_path))
+    matrix = cache.encode(PAYLOAD, LEVEL)
+    assert cache.stats()["disk_hits"] == 1
+    assert (matrix.to_array() == expected.to_array()).all()
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-3],
+    lambda data: data + b"\x00",
+    lambda data: data[len(FILE_MAGIC) + 2:],
+    lambda data: FILE_MAGIC + bytes((data[len(FILE_MAGIC)] + 1,)) + data[len(FILE_MAGIC) + 1:],
+    lambda data: b"",
+], ids=["truncated", "too long", "no header", "wrong version", "empty"])
+def test_damaged_file_is_a_miss(tmp_path, cached_file, damage):
+    expected, path = cached_file
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(damage(data))
+
+    cache = QRCodeCache(directory=str(tmp_path))
+    matrix = cache.encode(PAYLOAD, LEVEL)
+    assert cache.stats()["misses"] == 1
+    assert (matrix.to_array() == expected.to_array()).all()
+    # The fresh encode replaces the damaged file
+    with open(path, "rb") as file:
+        assert file.read() == data
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from lifetag.server import RenderServer
+
+
+VALID = {
+    "personal_info": {"name": "Jane Doe", "blood_group": "O-"},
+    "emergency_contact": {"name": "John Doe", "phone": "555 0100"},
+}
+
+
+async def send(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 10)
+    writer.close()
+    status_line, _, rest = response.partition(b"\r\n")
+    return int(status_line.split()[1]), rest.partition(b"\r\n\r\n")[2]
+
+
+def post(body, headers=None, target="/render?theme=standard"):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    headers = {"Content-Length": str(len(body)), "Connection": "close", **(headers or {})}
+    head = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return f"POST {target} HTTP/1.1\r\n{head}\r\n".encode("latin-1") + body
+
+
+def run_requests(*requests):
+    """Send each raw request on its own connection, returning (status, body) pairs"""
+    async def session():
+        server = RenderServer(port=0, workers=1)
+        await server.start()
+        try:
+            return [await send(server.port, request) for request in requests], server.stats()
+        finally:
+            server.close()
+    return asyncio.run(session())
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "+5", "1_0"])
+def test_bad_content_length_is_400(length):
+    [(status, body)], stats = run_requests(post(b"{}", {"Content-Length": length}))
+    assert status == 400
+    assert b"Content-Length" in body
+    assert stats["errors"] == 0
+
+
+@pytest.mark.parametrize("qr_data", [
+    [],
+    {"personal_info": []},
+    {"personal_info": {"name": "Jane Doe", "blood_group": "O-"},
+     "emergency_contact": {"name": "John Doe", "phone": 5}},
+    dict(VALID, emergency_number=[1]),
+    dict(VALID, address={"street": "Main"}),
+])
+def test_malformed_record_is_400(qr_data):
+    [(status, _body)], stats = run_requests(post(qr_data))
+    assert status == 400
+    assert stats["errors"] == 0 and stats["renders"] == 0
+
+
+def test_record_too_large_for_a_qr_code_is_413():
+    record = {**VALID, "additional_info": "x" * 4000}
+    [(status, _body)], stats = run_requests(post(record))
+    assert status == 413
+    assert stats["renders"] == 0
+
+
+def test_valid_record_renders():
+    [(status, body)], _stats = run_requests(post(VALID))
+    assert status == 200
+    assert body.startswith(b"\x89PNG")
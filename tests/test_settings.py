@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from lifetag import settings as settings_module
+from lifetag.settings import DEFAULTS, Settings
+
+
+@pytest.fixture
+def legacy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "qr_info_settings.json"
+    path.write_text(json.dumps({"info_message": "Hi", "emergency_number": "112"}), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def unwritable(monkeypatch):
+    def refuse(path, data, sync=False):
+        raise PermissionError(13, "Permission denied", path)
+    monkeypatch.setattr(settings_module, "write_atomic", refuse)
+
+
+def test_legacy_settings_are_migrated(tmp_path, legacy):
+    path = tmp_path / "config" / "settings.json"
+    settings = Settings(str(path))
+    assert settings.migrated and settings.load_error is None
+    assert settings.get("emergency_number") == "112"
+    assert json.loads(path.read_text(encoding="utf-8"))["profiles"]["default"]["emergency_number"] == "112"
+
+
+def test_unwritable_config_dir_keeps_imported_settings(tmp_path, legacy, unwritable):
+    settings = Settings(str(tmp_path / "config" / "settings.json"))
+    assert not settings.migrated
+    assert "not saved" in settings.load_error
+    assert settings.get("emergency_number") == "112"
+    assert legacy.exists()
+
+
+def test_unwritable_config_dir_fails_save_async_not_the_caller(tmp_path, unwritable):
+    settings = Settings(str(tmp_path / "settings.json"), legacy_path=None)
+    settings.update(emergency_number="999")
+    future = settings.save_async()
+    assert isinstance(future.exception(timeout=5), PermissionError)
+    settings.close()
+
+
+def test_unreadable_file_falls_back_to_defaults(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text("{broken", encoding="utf-8")
+    settings = Settings(str(path), legacy_path=None)
+    assert "default settings" in settings.load_error
+    assert settings.profile() == DEFAULTS
@@ -0,0 +1,91 @@
+import glob
+import hashlib
+import json
+
+import pytest
+
+from lifetag.store import (
+    STORED_FIELDS, RecordStore, data_hash, generate_key, main, normalize_name, normalize_phone, record_id,
+)
+
+
+RECORD = {
+    "full_name": "Jane  Doe",
+    "dob": "1990-04-01",
+    "blood_group": "O-",
+    "allergies": "Penicillin",
+    "emergency_contact_name": "John Doe",
+    "emergency_contact_phone": "+1 (555) 0100",
+}
+
+
+def database_bytes(path):
+    """Everything SQLite wrote for a database, including WAL and journal files"""
+    data = b""
+    for name in glob.glob(str(path) + "*"):
+        with open(name, "rb") as file:
+            data += file.read()
+    return data
+
+
+def guessable_values(data):
+    """Values an attacker can compute from a guessed name, date of birth or record"""
+    identity = f"{normalize_name(data['full_name'])}|{data['dob']}"
+    fields = {field: data.get(field, "") for field in STORED_FIELDS}
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    digests = [hashlib.sha256(value.encode("utf-8")).hexdigest() for value in (identity, canonical)]
+    return [record_id(data)[5:], data_hash(data)] + [digest[:16] for digest in digests] + digests + [
+        normalize_name(data["full_name"]), normalize_phone(data["emergency_contact_phone"]),
+        data["dob"], data["allergies"],
+    ]
+
+
+def test_plain_store_round_trip(tmp_path):
+    with RecordStore(str(tmp_path / "plain.db")) as store:
+        assert store.put(RECORD)
+        assert not store.put(dict(RECORD))
+        identifier = record_id(RECORD)
+        assert store.get(identifier)["allergies"] == "Penicillin"
+        assert [found["id"] for found in store.find_by_phone("15550100")] == [identifier]
+
+
+def test_store_keeps_the_profile(tmp_path):
+    with RecordStore(str(tmp_path / "plain.db")) as store:
+        store.put(dict(RECORD, profile="uk"))
+        identifier = record_id(RECORD)
+        assert store.get(identifier)["profile"] == "uk"
+        store.mark_rendered(identifier, "payload", "tag.png")
+        assert not store.needs_render(dict(RECORD, profile="uk"), "payload")
+        assert store.needs_render(dict(RECORD, profile="uk"), "other payload")
+        assert store.put(dict(RECORD, profile="default"))
+        assert store.needs_render(dict(RECORD, profile="default"))
+
+
+def test_encrypted_store_has_no_guessable_digests(tmp_path):
+    pytest.importorskip("cryptography")
+    path = tmp_path / "encrypted.db"
+    key = generate_key()
+
+    with RecordStore(str(path), key=key) as store:
+        assert store.put(RECORD)
+        identifier = store.record_id(RECORD)
+        assert identifier != record_id(RECORD)
+        store.mark_rendered(identifier, "payload", "tag.png")
+        assert not store.needs_render(dict(RECORD, id=identifier))
+
+    stored = database_bytes(path)
+    for value in guessable_values(RECORD):
+        assert value.encode("utf-8") not in stored
+
+    # Lookups and change tracking still work with the same key
+    with RecordStore(str(path), key=key) as store:
+        assert not store.put(dict(RECORD))
+        assert store.get(identifier)["allergies"] == "Penicillin"
+        assert [found["id"] for found in store.find_by_name("jane doe")] == [identifier]
+
+
+def test_store_rejects_bad_since(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(tmp_path / "records.db"), "changed", "--since", "yesterday"])
+    assert exit_info.value.code == 2
+    assert "--since" in capsys.readouterr().err